@@ -1,23 +1,55 @@
-import agentpy as ap
+import numpy as np
 
-from agents.tree_agent import Tree
 from agents.fireFighter_agent import Firefighter
 from agents.drone_agent import Drone
+from simulation.assignment import assign_contracts
+from simulation.contract_board import ContractBoard
+from simulation.core import AgentList, Model
+from simulation.fire_engine import FireEngine, BURNING, BURNED
+from simulation.fleet import DroneFleet, FirefighterFleet
+from simulation.log_export import StreamingExporter
+from simulation.log_sink import ColumnarLog, POSITION_COLUMNS, CONTRACT_COLUMNS, LOG_LEVELS
+from simulation.metrics import ContractMetrics
+from simulation.navigation import Navigator
+from simulation.profiling import Profiler, instrument_model
+from simulation.recording import TrajectoryRecorder
+from simulation.render import FrameRecorder
+from simulation.scheduler import EventScheduler, TwoPhaseScheduler
+from simulation.tiles import TileLayout, TiledFireEngine, rebalance_drones
 
-class ForestModel(ap.Model):
+class ForestModel(Model):
     def setup(self):
-        self.position_logs = []
-        self.contract_logs = []
-        self.fire_contracts = []
+        log_level = self.p.get('log_level', 'all')
+        if log_level not in LOG_LEVELS:
+            raise ValueError(f"log_level must be one of {LOG_LEVELS}, got {log_level!r}")
+        self.position_logs = ColumnarLog(POSITION_COLUMNS, enabled=log_level == 'all')
+        self.contract_logs = ColumnarLog(CONTRACT_COLUMNS, enabled=log_level != 'none')
+        self.fire_contracts = ContractBoard()
+        self.metrics = ContractMetrics()
         self.drone_debug_logs = []
         self.firefighter_debug_logs = []
         self.water_splashes = []
         self.fire_reports = []
 
-        n_trees = int(self.p['Tree density'] * (self.p.size ** 2))
-        self.grid = ap.Grid(self, [self.p.size, self.p.size], track_empty=True)
-        self.trees = ap.AgentList(self, n_trees, Tree)
-        self.grid.add_agents(self.trees, random=True, empty=True)
+        self.exporter = None
+        if self.p.get('log_dir'):
+            self.exporter = StreamingExporter(self.p.log_dir, {
+                'position_logs': self.position_logs,
+                'contract_logs': self.contract_logs,
+                'drone_debug_logs': self.drone_debug_logs,
+                'firefighter_debug_logs': self.firefighter_debug_logs,
+            }, every=self.p.get('log_flush_every', 10))
+
+        # The forest is held by the fire engine's arrays; each cell holds a
+        # tree with probability 'Tree density'
+        shape = (self.p.size, self.p.size)
+        trees = self.draw_forest(shape)
+        tiles = self.p.get('tiles', (2, 2))
+        if self.p.get('fire_engine', 'agents') == 'tiled':
+            self.fire = TiledFireEngine(self, shape, tiles)
+        else:
+            self.fire = FireEngine(self, shape)
+        self.fire.plant(trees)
 
         center_x, center_y = self.p.size // 2, self.p.size // 2
         fire_size = 5
@@ -25,51 +57,133 @@ class ForestModel(ap.Model):
             for dy in range(-fire_size // 2, fire_size // 2 + 1):
                 x, y = center_x + dx, center_y + dy
                 if 0 <= x < self.p.size and 0 <= y < self.p.size:
-                    tree = self.grid.agents[x, y].to_list()
-                    if tree:
-                        tree[0].condition = 1
+                    if self.fire.has_tree(x, y):
+                        self.fire.set_condition((x, y), BURNING)
+
+        self.navigation = Navigator(self)
+
+        # Firefighters and drones live in their fleets' arrays; occupancy
+        # counts them per cell
+        self.occupancy = np.zeros(shape, dtype=np.int16)
 
         n_firefighters = self.p.num_firefighters
-        self.firefighters = ap.AgentList(self, n_firefighters, Firefighter)
-        self.grid.add_agents(self.firefighters, random=True, empty=True)
+        self.firefighter_fleet = FirefighterFleet(self, n_firefighters)
+        self.firefighters = AgentList(self, n_firefighters, Firefighter)
+        self.firefighter_fleet.place(self.sample_empty_cells(n_firefighters))
         for i, firefighter in enumerate(self.firefighters):
             firefighter.firefighter_id = f"F{i}"
 
         n_drones = self.p.num_drones
-        self.drones = ap.AgentList(self, n_drones, Drone)
-        self.grid.add_agents(self.drones, random=True, empty=True)
-        self.drone_targets = {0: None, 1: None, 2: None, 3: None}
+        self.drone_fleet = DroneFleet(self, n_drones)
+        self.drones = AgentList(self, n_drones, Drone)
+        self.drone_fleet.place(self.sample_empty_cells(n_drones))
 
-        mid = self.p.size // 2
+        # Drones patrol one tile each, starting round-robin; rebalance_drones
+        # moves them towards the tiles that are on fire
+        self.tiles = TileLayout(shape, tiles)
         for i, drone in enumerate(self.drones):
             drone.drone_id = f"D{i}"
-            drone.quadrant = i % 4
-            if drone.quadrant == 0:
-                drone.row_min, drone.row_max = 0, mid - 1
-                drone.col_min, drone.col_max = 0, mid - 1
-            elif drone.quadrant == 1:
-                drone.row_min, drone.row_max = 0, mid - 1
-                drone.col_min, drone.col_max = mid, self.p.size - 1
-            elif drone.quadrant == 2:
-                drone.row_min, drone.row_max = mid, self.p.size - 1
-                drone.col_min, drone.col_max = 0, mid - 1
-            elif drone.quadrant == 3:
-                drone.row_min, drone.row_max = mid, self.p.size - 1
-                drone.col_min, drone.col_max = mid, self.p.size - 1
+            tile = i % len(self.tiles)
+            drone.set_tile(tile, self.tiles.bounds(tile))
+        self.tile_drones = {}
+
+        self.scheduler = None
+        if self.p.get('scheduler', 'all') == 'event':
+            self.scheduler = EventScheduler(self)
+        elif self.p.get('scheduler', 'all') == 'two_phase':
+            self.scheduler = TwoPhaseScheduler(self, self.p.get('decision_workers', 0))
+
+        # 'profile': True times phases and agent methods, 'phases' only the phases
+        self.profiler = None
+        if self.p.get('profile'):
+            self.profiler = Profiler()
+            instrument_model(self.profiler, self, agents=self.p.profile != 'phases')
+
+        self.frames = None
+        if self.p.get('record_frames'):
+            self.frames = FrameRecorder(self)
+            self.frames.capture()
+
+        # Compact on-disk recording for simulation.recording.Replay
+        self.trajectory = None
+        if self.p.get('record_dir'):
+            self.trajectory = TrajectoryRecorder(self, self.p.record_dir, self.p.get('record_keyframe_every', 50))
+            self.trajectory.capture()
+
+    def draw_forest(self, shape):
+        # Drawn in blocks of rows, so no float array the size of the grid is made
+        trees = np.empty(shape, dtype=bool)
+        block = max(1, 2 ** 22 // shape[1])
+        for start in range(0, shape[0], block):
+            stop = min(start + block, shape[0])
+            trees[start:stop] = self.nprandom.random((stop - start, shape[1]), dtype=np.float32) < self.p['Tree density']
+        return trees
+
+    def sample_empty_cells(self, n):
+        # Cells with neither a tree nor an agent on them
+        trees = np.unpackbits(self.fire.tree_mask, axis=1, count=self.p.size)
+        empty = np.flatnonzero((trees == 0) & (self.occupancy == 0))
+        cells = empty[self.random.sample(range(len(empty)), k=n)]
+        return np.stack(np.divmod(cells, self.p.size), axis=1)
+
+    def fire_phase(self):
+        if self.p.get('fire_engine', 'agents') in ('vectorized', 'tiled'):
+            self.fire.spread(self.fire.burning_cells())
+        else:
+            self.fire.spread_trees(self.fire.burning_trees())
+
+    def firefighter_phase(self):
+        if self.scheduler:
+            self.scheduler.firefighter_phase()
+        else:
+            self.firefighters.step()
+        self.firefighter_fleet.move()
+
+    def assignment_phase(self):
+        assign_contracts(self)
+
+    def drone_phase(self):
+        self.fire.label_clusters()
+        rebalance_drones(self)
+        if self.scheduler:
+            self.scheduler.drone_phase()
+        else:
+            self.drones.step()
+        self.drone_fleet.move()
 
     def step(self):
-        burning_trees = self.trees.select(self.trees.condition == 1)
-        for tree in burning_trees:
-            tree.spreadFire()
-            tree.burnOut()
+        self.fire_phase()
+        self.firefighter_phase()
+        self.assignment_phase()
+        self.drone_phase()
+
+        self.metrics.record(self)
+        self.navigation.end_step()
 
-        self.firefighters.step()
-        self.drones.step()
+        if self.exporter:
+            self.exporter.step(self.t)
 
-        if self.t >= self.p.steps:
+        if self.profiler:
+            self.profiler.end_step(self.t)
+
+        if self.frames:
+            self.frames.capture()
+
+        if self.trajectory:
+            self.trajectory.capture()
+
+        if self.t >= self.p.steps or (self.scheduler and self.scheduler.finished()):
             self.stop()
 
     def end(self):
-        burned_trees = len(self.trees.select(self.trees.condition == 2))
-        self.report('Percentage of burned trees', burned_trees / len(self.trees))
+        if self.exporter:
+            self.exporter.flush()
+        if self.trajectory:
+            self.trajectory.close()
+        if self.scheduler:
+            self.scheduler.close()
+        self.fire.close()
+
+        burned_trees = self.fire.count(BURNED)
+        self.report('Percentage of burned trees', burned_trees / self.fire.n_trees)
         self.report('Density', self.p['Tree density'])
\ No newline at end of file
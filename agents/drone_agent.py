@@ -1,20 +1,16 @@
-import agentpy as ap
+import math
 
-import numpy as np
-from collections import deque
+from simulation.core import Agent
 
-from agents.tree_agent import Tree
-
-class Drone(ap.Agent):
+class Drone(Agent):
     def setup(self):
         self.drone_id = id(self)
         self.debug = getattr(self.p, "debug_mode", False)
 
-        self.grid = self.model.grid
+        self.fleet = self.model.drone_fleet
+        self.index = self.fleet.register(self)
         self.random = self.model.random
-        self.speed = self.p.drone_speed
         self.sensor_range = self.p.drone_sensor_range
-        self.battery = self.p.drone_max_battery
         self.battery_warning = self.p.drone_battery_warning
 
         self.base_station = (self.p.size - 1, self.p.size - 1)
@@ -25,178 +21,178 @@ class Drone(ap.Agent):
 
         self.target = self.random_target_in_quadrant()
 
-    def random_target_in_quadrant(self):
+    @property
+    def pos(self):
+        return self.fleet.position(self.index)
+
+    @pos.setter
+    def pos(self, cell):
+        self.fleet.set_position(self.index, cell)
+
+    @property
+    def speed(self):
+        return int(self.fleet.speed[self.index])
+
+    @property
+    def battery(self):
+        return float(self.fleet.battery[self.index])
+
+    @battery.setter
+    def battery(self, value):
+        self.fleet.battery[self.index] = value
+
+    def set_tile(self, tile, bounds):
+        self.tile = tile
+        self.row_min, row_stop, self.col_min, col_stop = bounds
+        self.row_max, self.col_max = row_stop - 1, col_stop - 1
+
+    def route(self, cell):
+        # Contracts are managed by a drone patrolling the tile they lie in
+        tile = int(self.model.tiles.tile_of([cell])[0])
+        owners = self.model.tile_drones.get(tile)
+        return tile, owners[0].drone_id if owners else self.drone_id
+
+    def random_target_in_quadrant(self, draw=None):
+        # draw: a pair of uniform numbers drawn in advance, else self.random is used
+        if draw is not None:
+            return (self.row_min + int(draw[0] * (self.row_max - self.row_min + 1)),
+                    self.col_min + int(draw[1] * (self.col_max - self.col_min + 1)))
         row = self.random.randint(self.row_min, self.row_max + 1)
         col = self.random.randint(self.col_min, self.col_max + 1)
         return (row, col)
 
     def is_at_position(self, pos, threshold=1):
-        my_pos = np.array(self.grid.positions[self])
-        return np.linalg.norm(my_pos - np.array(pos)) < threshold
+        return math.dist(self.pos, pos) < threshold
 
     def move_towards(self, target_pos):
-        my_pos = np.array(self.grid.positions[self])
-        target = np.array(target_pos)
-        direction = target - my_pos
-
-        if np.linalg.norm(direction) <= self.speed:
-            new_pos = target
-        else:
-            new_pos = my_pos + np.sign(direction) * self.speed
-
-        new_pos = np.clip(new_pos, 0, self.p.size - 1)
-        self.battery -= np.linalg.norm(my_pos - new_pos)
-        self.grid.move_to(self, tuple(new_pos.astype(int)))
+        # Applied together with the other drones' moves by DroneFleet.move
+        self.fleet.request_move(self.index, target_pos)
 
     def return_to_base(self):
         if self.is_at_position(self.base_station):
-            self.grid.move_to(self, self.base_station)
             self.battery = self.p.drone_max_battery
             self.target = self.random_target_in_quadrant()
         else:
             self.move_towards(self.base_station)
 
-    def contract_exists(self, pos):
-        return any(
-            c["location"] == pos and c["status"] != "complete"
-            for c in self.model.fire_contracts
-        )
+    def contract_exists(self, cells):
+        return self.model.fire_contracts.any_at(cells)
 
     def cluster_fires(self, fire_positions):
-        visited = set()
-        clusters = []
-
-        def neighbors(pos):
-            x, y = pos
-            return [(x+1, y), (x-1, y), (x, y+1), (x, y-1)]
-
-        for fire in fire_positions:
-            if fire in visited:
-                continue
-            cluster = []
-            queue = deque([fire])
-            while queue:
-                current = queue.popleft()
-                if current in visited:
-                    continue
-                visited.add(current)
-                cluster.append(current)
-                for n in neighbors(current):
-                    if n in fire_positions and n not in visited:
-                        queue.append(n)
-            clusters.append(cluster)
-        return clusters
+        return self.model.fire.clusters_of(fire_positions)
 
     def perceive_fire(self):
-        fires = [
-            tree for tree in self.model.trees
-            if isinstance(tree, Tree) and tree.condition == 1
-        ]
-
-        visible_fires = []
-        for tree in fires:
-            pos = self.grid.positions[tree]
-            if np.linalg.norm(np.array(pos) - np.array(self.grid.positions[self])) <= self.sensor_range:
-                visible_fires.append(pos)
+        # Visible burning cells and the clusters among them without a contract
+        visible_fires = self.model.fire.burning_within(self.pos, self.sensor_range)
+        if not visible_fires:
+            return visible_fires, []
+        clusters = [c for c in self.cluster_fires(visible_fires) if not self.contract_exists(c)]
+        return visible_fires, clusters
+
+    def create_contract(self, cluster):
+        center_pos = cluster[0]
+        team_size = max(1, len(cluster) // 2)
+        tile, manager = self.route(center_pos)
+
+        contract = {
+            "task_id": f"fire_{center_pos[0]}_{center_pos[1]}_{self.model.t}",
+            "location": center_pos,
+            "cluster": cluster,
+            "type": "extinguish_fire",
+            "timestamp": self.model.t,
+            "status": "open",
+            "bids": [],
+            "assigned": [],
+            "team_size": team_size,
+            "assign_time": None,
+            "manager": manager,
+            "tile": tile
+        }
+
+        self.model.fire_contracts.add(contract)
+        self.model.metrics.created(contract)
+
+        self.model.contract_logs.append(
+            event="created",
+            task_id=contract["task_id"],
+            x=center_pos[0],
+            y=center_pos[1],
+            cluster_size=len(cluster),
+            team_size=team_size,
+            drone_id=self.drone_id,
+            time=self.model.t
+        )
 
-        if visible_fires:
-            clustered = self.cluster_fires(set(visible_fires))
-
-            for cluster in clustered:
-                if all(not self.contract_exists(pos) for pos in cluster):
-                    center_pos = cluster[0]
-                    team_size = max(1, len(cluster) // 2)
-
-                    contract = {
-                        "task_id": f"fire_{center_pos[0]}_{center_pos[1]}_{self.model.t}",
-                        "location": center_pos,
-                        "cluster": cluster,
-                        "type": "extinguish_fire",
-                        "timestamp": self.model.t,
-                        "status": "open",
-                        "bids": [],
-                        "assigned": [],
-                        "team_size": team_size,
-                        "assign_time": None,
-                        "manager": self.drone_id
-                    }
-
-                    self.model.fire_contracts.append(contract)
-
-                    self.model.contract_logs.append({
-                        "event": "created",
-                        "task_id": contract["task_id"],
-                        "location": center_pos,
-                        "cluster_size": len(cluster),
-                        "team_size": team_size,
-                        "drone_id": self.drone_id,
-                        "time": self.model.t
-                    })
-
-            if self.debug:
-                self.model.drone_debug_logs.append({
-                    "drone_id": self.drone_id,
-                    "detected_fires": visible_fires,
-                    "time": self.model.t
-                })
-
-            self.target = visible_fires[0]
-            return True
-
-        return False
+    def log_position(self):
+        my_pos = self.pos
+        self.model.position_logs.append(
+            time=self.model.t,
+            agent_id=self.drone_id,
+            type="drone",
+            x=int(my_pos[0]),
+            y=int(my_pos[1])
+        )
 
-    def step(self):
-        my_pos = np.array(self.grid.positions[self])
-        base_pos = np.array(self.base_station)
-        distance_to_base = np.linalg.norm(my_pos - base_pos)
-
-        self.model.position_logs.append({
-            "time": self.model.t,
-            "agent_id": self.drone_id,
-            "type": "drone",
-            "x": int(my_pos[0]),
-            "y": int(my_pos[1])
-        })
-
-        if self.battery <= distance_to_base + self.battery_warning:
-            self.return_to_base()
-            return
-
-        for contract in self.model.fire_contracts:
-            if contract["status"] == "open" and contract["manager"] == self.drone_id and contract["bids"]:
-                sorted_bids = sorted(contract["bids"], key=lambda b: b["bid"])
-                selected_bids = sorted_bids[:contract["team_size"]]
-                contract["assigned"] = [b["firefighter_id"] for b in selected_bids]
-                contract["status"] = "assigned"
-                contract["assign_time"] = self.model.t
-
-                for bid in selected_bids:
-                    self.model.contract_logs.append({
-                        "event": "assignment",
-                        "task_id": contract["task_id"],
-                        "drone_id": self.drone_id,
-                        "assigned_to": bid["firefighter_id"],
-                        "bid": bid["bid"],
-                        "time": self.model.t
-                    })
-
-        for contract in self.model.fire_contracts:
-            if (contract["status"] == "open" and
-                contract["manager"] == self.drone_id and
-                contract["bids"] and
-                (self.model.t - contract["timestamp"] >= 1)):
-                sorted_bids = sorted(contract["bids"], key=lambda b: b["bid"])
-                selected = sorted_bids[:contract.get("team_size", 2)]
-                contract["assigned"] = [b["firefighter_id"] for b in selected]
-                contract["status"] = "assigned"
-                contract["assign_time"] = self.model.t
-
-        if self.perceive_fire():
-            if not self.is_at_position(self.target):
-                self.move_towards(self.target)
-            return
+    def needs_recharge(self):
+        distance_to_base = math.dist(self.pos, self.base_station)
+        return self.battery <= distance_to_base + self.battery_warning
 
+    def patrol(self):
         if self.is_at_position(self.target):
             self.target = self.random_target_in_quadrant()
         else:
-            self.move_towards(self.target)
\ No newline at end of file
+            self.move_towards(self.target)
+
+    def decide(self, target_draw=None):
+        # This step's actions, worked out without changing the model or the
+        # agent; apply() carries them out
+        intent = {"recharge": False, "clusters": [], "detected": None, "target": None, "move": None}
+
+        if self.needs_recharge():
+            if self.is_at_position(self.base_station):
+                intent["recharge"] = True
+                intent["target"] = self.random_target_in_quadrant(target_draw)
+            else:
+                intent["move"] = self.base_station
+            return intent
+
+        visible_fires, clusters = self.perceive_fire()
+        if visible_fires:
+            intent["detected"] = visible_fires
+            intent["clusters"] = clusters
+            intent["target"] = visible_fires[0]
+            if not self.is_at_position(visible_fires[0]):
+                intent["move"] = visible_fires[0]
+            return intent
+
+        if self.is_at_position(self.target):
+            intent["target"] = self.random_target_in_quadrant(target_draw)
+        else:
+            intent["move"] = self.target
+        return intent
+
+    def apply(self, intent):
+        # A cluster another drone has put a contract on in the same phase is skipped
+        self.log_position()
+
+        if intent["recharge"]:
+            self.battery = self.p.drone_max_battery
+
+        for cluster in intent["clusters"]:
+            if not self.contract_exists(cluster):
+                self.create_contract(cluster)
+
+        if intent["detected"] and self.debug:
+            self.model.drone_debug_logs.append({
+                "drone_id": self.drone_id,
+                "detected_fires": intent["detected"],
+                "time": self.model.t
+            })
+
+        if intent["target"] is not None:
+            self.target = intent["target"]
+        if intent["move"] is not None:
+            self.move_towards(intent["move"])
+
+    def step(self):
+        self.apply(self.decide())
\ No newline at end of file
@@ -1,32 +1,45 @@
-import agentpy as ap
-import numpy as np
+import math
 
-from agents.tree_agent import Tree
+from simulation.core import Agent
 
-class Firefighter(ap.Agent):
+class Firefighter(Agent):
     def setup(self):
         self.position_logs = []
         self.active_timesteps = 0
-        self.grid = self.model.grid
+        self.fleet = self.model.firefighter_fleet
+        self.index = self.fleet.register(self)
         self.random = self.model.random
-        self.water_supply = self.p.max_water
-        self.speed = self.p.base_speed
         self.sensor_range = self.p.sensor_range
         self.extinguishing_time = 0
         self.base_station = None
         self.debug = getattr(self.p, "debug_mode", True)
 
+    @property
+    def pos(self):
+        return self.fleet.position(self.index)
+
+    @pos.setter
+    def pos(self, cell):
+        self.fleet.set_position(self.index, cell)
+
+    @property
+    def speed(self):
+        return int(self.fleet.speed[self.index])
+
+    @property
+    def water_supply(self):
+        return int(self.fleet.water[self.index])
+
+    @water_supply.setter
+    def water_supply(self, value):
+        self.fleet.water[self.index] = value
+
     def on_add(self):
-        self.base_station = self.grid.positions[self]
+        self.base_station = self.pos
 
     def move_towards_fire(self, target_pos):
-        my_pos = np.array(self.grid.positions[self])
-        direction = np.array(target_pos) - my_pos
-        new_pos = my_pos + np.sign(direction) * self.speed
-        new_pos = (int(new_pos[0]), int(new_pos[1]))
-        if (0 <= new_pos[0] < self.p.size) and (0 <= new_pos[1] < self.p.size):
-            if not self.grid.agents[new_pos]:
-                self.grid.move_to(self, new_pos)
+        # Applied together with the other firefighters' moves by FirefighterFleet.move
+        self.fleet.request_move(self.index, target_pos)
 
     def extinguish_fire(self, tree):
         if self.water_supply > 0 and self.extinguishing_time == 0:
@@ -36,109 +49,156 @@ class Firefighter(ap.Agent):
             if self.extinguishing_time == 0:
                 tree.condition = 2
                 self.water_supply -= 1
-                self.model.water_splashes.append((self.grid.positions[tree], self.model.t))
+                self.model.water_splashes.append((tree.cell, self.model.t))
                 if self.debug:
                     self.model.firefighter_debug_logs.append({
                         "firefighter_id": self.firefighter_id,
-                        "fire_x": self.grid.positions[tree][0],
-                        "fire_y": self.grid.positions[tree][1],
+                        "fire_x": tree.cell[0],
+                        "fire_y": tree.cell[1],
                         "time": self.model.t
                     })
 
     def refill_water(self):
-        if self.grid.positions[self] == self.base_station:
+        if self.pos == self.base_station:
             self.water_supply = self.p.max_water
 
-    def step(self):
-        my_pos = np.array(self.grid.positions[self])
-
-        self.model.position_logs.append({
-            "time": self.model.t,
-            "agent_id": self.firefighter_id,
-            "type": "firefighter",
-            "x": int(my_pos[0]),
-            "y": int(my_pos[1])
-        })
+    def log_position(self):
+        my_pos = self.pos
+        self.model.position_logs.append(
+            time=self.model.t,
+            agent_id=self.firefighter_id,
+            type="firefighter",
+            x=int(my_pos[0]),
+            y=int(my_pos[1])
+        )
+
+    def wander(self, rand_pos=None):
+        if rand_pos is None:
+            rand_pos = (self.random.randint(0, self.p.size), self.random.randint(0, self.p.size))
+        self.move_towards_fire(rand_pos)
+
+    def make_bid(self, dist):
+        return {
+            "firefighter_id": self.firefighter_id,
+            "bid": dist / (self.water_supply + 1e-5),
+            "distance": dist,
+            "water": self.water_supply,
+            "time": self.model.t
+        }
+
+    def submit_bid(self, contract, bid):
+        self.model.fire_contracts.add_bid(contract, bid)
+        self.model.contract_logs.append(
+            event="bid",
+            task_id=contract["task_id"],
+            firefighter_id=self.firefighter_id,
+            bid=bid["bid"],
+            distance=bid["distance"],
+            water=bid["water"],
+            time=self.model.t
+        )
+
+    def decide(self, wander_target=None):
+        # This step's actions, worked out without changing the model or the
+        # agent; apply() carries them out
+        intent = {"refill": False, "bids": [], "declined": [], "route": None, "complete": None,
+                  "detected": None, "move": None, "extinguish": None}
+        my_pos = self.pos
 
         if self.water_supply == 0:
-            self.refill_water()
-            return
+            intent["refill"] = True
+            return intent
 
-        assigned_contracts = [
-            c for c in self.model.fire_contracts
-            if self.firefighter_id in c.get("assigned", []) and c["status"] == "assigned"
-        ]
+        board = self.model.fire_contracts
+        navigation = self.model.navigation
+        assigned_contracts = board.assigned_to(self.firefighter_id)
 
         if not assigned_contracts:
-            for contract in self.model.fire_contracts:
-                if contract["status"] == "open":
-                    if any(b["firefighter_id"] == self.firefighter_id for b in contract["bids"]):
-                        continue
-                    dist = np.linalg.norm(my_pos - np.array(contract["location"]))
-                    bid_value = dist / (self.water_supply + 1e-5)
-                    contract["bids"].append({
-                        "firefighter_id": self.firefighter_id,
-                        "bid": bid_value,
-                        "distance": dist,
-                        "water": self.water_supply,
-                        "time": self.model.t
-                    })
-                    self.model.contract_logs.append({
-                        "event": "bid",
-                        "task_id": contract["task_id"],
-                        "firefighter_id": self.firefighter_id,
-                        "bid": bid_value,
-                        "distance": dist,
-                        "water": self.water_supply,
-                        "time": self.model.t
-                    })
+            for contract in board.with_status("open"):
+                if board.has_evaluated(contract, self.firefighter_id):
+                    continue
+                # Path length around trees; no bid on fires out of reach
+                dist = navigation.distance(my_pos, contract["location"])
+                if dist == math.inf:
+                    intent["declined"].append(contract)
+                    continue
+                intent["bids"].append((contract, self.make_bid(dist)))
 
         if assigned_contracts:
             contract = assigned_contracts[0]
             cluster = contract.get("cluster", [contract["location"]])
-            burning_cluster = [
-                t for t in self.model.trees
-                if self.grid.positions[t] in cluster and t.condition == 1
-            ]
+            burning_cluster = [pos for pos in cluster if pos in self.model.fire.burning]
             if burning_cluster:
-                closest = min(burning_cluster, key=lambda t: np.linalg.norm(my_pos - np.array(self.grid.positions[t])))
-                target_pos = self.grid.positions[closest]
-                if np.linalg.norm(my_pos - target_pos) > self.sensor_range:
-                    self.move_towards_fire(target_pos)
+                # One field for the burning part of the cluster, not one per cell
+                if navigation.distance(my_pos, *burning_cluster) > 0:
+                    intent["route"] = tuple(burning_cluster)
                 else:
-                    self.extinguish_fire(closest)
+                    intent["extinguish"] = min(burning_cluster, key=lambda cell: math.dist(my_pos, cell))
             else:
-                contract["status"] = "complete"
-                self.model.contract_logs.append({
-                    "event": "complete",
-                    "task_id": contract["task_id"],
+                intent["complete"] = contract
+
+        local_fires = self.model.fire.burning_within(my_pos, self.sensor_range)
+        if intent["route"] is not None or intent["extinguish"] is not None:
+            # Still working the contract: the fires nearby count as detected, but
+            # moves are applied once per phase and a second one would replace the route
+            intent["detected"] = local_fires
+            return intent
+        if local_fires:
+            intent["detected"] = local_fires
+            intent["move"] = intent["extinguish"] = local_fires[0]
+            return intent
+
+        if wander_target is None:
+            wander_target = (self.random.randint(0, self.p.size), self.random.randint(0, self.p.size))
+        intent["move"] = wander_target
+        return intent
+
+    def apply(self, intent):
+        # Re-checks what earlier commits in the same phase may have changed,
+        # so a contract is completed and a fire put out only once
+        self.log_position()
+
+        if intent["refill"]:
+            self.refill_water()
+            return
+
+        board = self.model.fire_contracts
+        for contract, bid in intent["bids"]:
+            self.submit_bid(contract, bid)
+        for contract in intent["declined"]:
+            board.decline(contract, self.firefighter_id)
+
+        if intent["route"] is not None:
+            self.fleet.request_route(self.index, self.model.navigation.field(*intent["route"]))
+
+        contract = intent["complete"]
+        if contract is not None and contract["status"] == "assigned":
+            board.complete(contract)
+            self.model.metrics.completed(contract, self.model.t)
+            self.model.contract_logs.append(
+                event="complete",
+                task_id=contract["task_id"],
+                firefighter_id=self.firefighter_id,
+                x=contract["location"][0],
+                y=contract["location"][1],
+                time=self.model.t
+            )
+
+        if intent["detected"]:
+            if self.debug:
+                self.model.firefighter_debug_logs.append({
                     "firefighter_id": self.firefighter_id,
-                    "location": contract["location"],
+                    "detected_fires": intent["detected"],
                     "time": self.model.t
                 })
+            self.active_timesteps += 1
 
-        local_fires = [
-            tree for tree in self.model.trees
-            if isinstance(tree, Tree) and tree.condition == 1 and
-            np.linalg.norm(np.array(self.grid.positions[tree]) - my_pos) <= self.sensor_range
-        ]
+        if intent["move"] is not None:
+            self.move_towards_fire(intent["move"])
 
-        if self.debug and local_fires:
-            fire_positions = [self.grid.positions[tree] for tree in local_fires]
-            self.model.firefighter_debug_logs.append({
-                "firefighter_id": self.firefighter_id,
-                "detected_fires": fire_positions,
-                "time": self.model.t
-            })
+        cell = intent["extinguish"]
+        if cell is not None and cell in self.model.fire.burning:
+            self.extinguish_fire(self.model.fire.tree(cell))
 
-        if local_fires:
-            self.active_timesteps += 1
-            closest = min(local_fires, key=lambda t: np.linalg.norm(np.array(self.grid.positions[t]) - my_pos))
-            target_pos = self.grid.positions[closest]
-            self.move_towards_fire(target_pos)
-            if np.linalg.norm(np.array(target_pos) - my_pos) <= self.sensor_range:
-                self.extinguish_fire(closest)
-            return
-
-        rand_pos = (self.random.randint(0, self.p.size), self.random.randint(0, self.p.size))
-        self.move_towards_fire(rand_pos)
\ No newline at end of file
+    def step(self):
+        self.apply(self.decide())
\ No newline at end of file
@@ -1,18 +1,35 @@
 # Model design
-import agentpy as ap
+from simulation.core import Agent
 
-class Tree(ap.Agent):
-    def setup(self):
-        self.condition = 0  # 0 = Alive, 1 = Burning, 2 = Burned
+class Tree(Agent):
+    def setup(self, cell):
+        # Condition and burn time live in the model's FireEngine arrays,
+        # the agent is only a view on its cell, created on first use
+        self.cell = cell
         self.growth_rate = self.p.get('tree_growth_rate', 0.01)
-        self.burn_time = self.p.get('tree_burn_time', 8)
+
+    @property
+    def condition(self):  # 0 = Alive, 1 = Burning, 2 = Burned
+        return int(self.model.fire.condition[self.cell])
+
+    @condition.setter
+    def condition(self, value):
+        self.model.fire.set_condition(self.cell, value)
+
+    @property
+    def burn_time(self):
+        return int(self.model.fire.burn_time[self.cell])
+
+    @burn_time.setter
+    def burn_time(self, value):
+        self.model.fire.burn_time[self.cell] = value
 
     def spreadFire(self):
         if self.condition == 1:
-            neighbors = self.model.grid.neighbors(self)
-            for neighbor in neighbors:
-                if isinstance(neighbor, Tree) and neighbor.condition == 0:
-                    if self.model.random.random() < self.p.get('probSpread', 0.2):
+            targets = self.model.fire.spread_targets(self.cell)
+            for neighbor, prob in targets:
+                if neighbor.condition == 0:
+                    if self.model.random.random() < prob:
                         neighbor.condition = 1
                         neighbor.burn_time = self.p.get('tree_burn_time', 8)
 
@@ -20,4 +37,4 @@ class Tree(ap.Agent):
         if self.condition == 1:
             self.burn_time -= 1
             if self.burn_time <= 0:
-                self.condition = 2
\ No newline at end of file
+                self.condition = 2
@@ -1,151 +1,144 @@
+import argparse
+import ast
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.realpath(__file__)))
-from agents.tree_agent import Tree
-
-import agentpy as ap
-import numpy as np
-import pandas as pd
-
-import matplotlib.pyplot as plt
-import IPython
 
 from ForestModel import ForestModel
+from simulation.parameters import DEFAULT_PARAMETERS
+from simulation.render import render_in_background
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the forest fire model.")
+    parser.add_argument('--steps', type=int, default=DEFAULT_PARAMETERS['steps'])
+    parser.add_argument('--seed', type=int, default=DEFAULT_PARAMETERS['seed'])
+    parser.add_argument('--size', type=int, default=DEFAULT_PARAMETERS['size'])
+    parser.add_argument('--set', metavar='KEY=VALUE', action='append', default=[],
+                        help="override any parameter, e.g. --set \"Tree density=0.6\" --set fire_engine=vectorized")
+    parser.add_argument('--no-export', dest='export', action='store_false',
+                        help="keep no logs and skip the CSV exports (and pandas)")
+    parser.add_argument('--no-animation', dest='animation', action='store_false',
+                        help="do not record frames or render the GIF (and matplotlib)")
+    parser.add_argument('--record', metavar='DIR',
+                        help="write a compact recording to DIR and render the GIF from it instead of from memory")
+    return parser.parse_args(argv)
+
+
+def parameters_from(args):
+    parameters = dict(DEFAULT_PARAMETERS, steps=args.steps, seed=args.seed, size=args.size)
+    for item in args.set:
+        key, _, value = item.partition('=')
+        try:
+            parameters[key] = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            parameters[key] = value
+    # Frames in memory only for the GIF; with --record it is rendered from disk
+    parameters['record_frames'] = args.animation and not args.record
+    if args.record:
+        parameters['record_dir'] = args.record
+    if not args.export:
+        parameters['debug_mode'] = False
+        parameters['log_level'] = 'none'
+    return parameters
+
+
+def export_logs(log_model, parameters):
+    import pandas as pd
+    from simulation.log_export import read_log, read_records
+
+    log_dir = parameters['log_dir']
+    if log_dir:
+        # The streamed parts are all on disk, the in-memory logs were drained
+        print(f"✅ Logs streamed to '{log_dir}' during the run")
+        contract_frame = read_log(log_dir, 'contract_logs')
+        position_frame = read_log(log_dir, 'position_logs')
+        firefighter_debug_logs = read_records(log_dir, 'firefighter_debug_logs')
+        drone_debug_logs = read_records(log_dir, 'drone_debug_logs')
+    else:
+        contract_frame = log_model.contract_logs.to_frame()
+        position_frame = log_model.position_logs.to_frame()
+        firefighter_debug_logs = log_model.firefighter_debug_logs
+        drone_debug_logs = log_model.drone_debug_logs
+
+    if firefighter_debug_logs:
+        ff_logs = [
+            {
+                "firefighter_id": log["firefighter_id"],
+                "detected_fires": ";".join([f"({x},{y})" for x, y in log["detected_fires"]]),
+                "time": log["time"]
+            }
+            for log in firefighter_debug_logs if "detected_fires" in log
+        ]
+        if ff_logs:
+            pd.DataFrame(ff_logs).to_csv("firefighter_fire_logs.csv", index=False)
+            print("✅ Firefighter perception logs exported to 'firefighter_fire_logs.csv'")
+        else:
+            print("⚠️ No firefighter detections to export.")
+
+    if drone_debug_logs:
+        pd.DataFrame(drone_debug_logs).to_csv("drone_fire_logs.csv", index=False)
+        print("✅ Drone detection logs exported to 'drone_fire_logs.csv'")
+    else:
+        print("⚠️ No drone detections to log.")
 
-def animation_plot(model, ax):
-    attr_grid = np.full((model.p.size, model.p.size), np.nan)
-    for tree in model.trees:
-        pos = model.grid.positions[tree]
-        attr_grid[pos] = tree.condition
-
-    color_dict = {
-        0: '#7FC97F',
-        1: '#d62c2c',
-        2: '#e5e5e5',
-        None: '#d5e5d5'
-    }
-    ap.gridplot(attr_grid, ax=ax, color_dict=color_dict, convert=True)
-
-    for pos, timestamp in model.water_splashes:
-        if model.t - timestamp < 5:
-            ax.scatter(pos[1], pos[0], color='white', s=20, marker='o', alpha=0.9)
-
-    for firefighter in model.firefighters:
-        pos = model.grid.positions[firefighter]
-        halo = plt.Circle((pos[1], pos[0]), firefighter.sensor_range, color='cyan', alpha=0.2)
-        ax.add_patch(halo)
-        ax.text(pos[1], pos[0], f"{firefighter.firefighter_id}", color='blue',
-                fontsize=5, fontweight='bold', ha='center', va='center')
-
-    for drone in model.drones:
-        pos = model.grid.positions[drone]
-        halo = plt.Circle((pos[1], pos[0]), drone.sensor_range, color='yellow', alpha=0.1)
-        ax.add_patch(halo)
-        ax.scatter(pos[1], pos[0], color='yellow', s=50, marker='D')
-        ax.text(pos[1], pos[0], drone.drone_id, color='orange', fontsize=9,
-                ha='center', va='center', fontweight='bold')
-
-    alive_trees = len(model.trees.select(model.trees.condition == 0))
-    ax.set_title(f"Forest Fire Simulation\nTime-step: {model.t}, Trees left: {alive_trees}")
-
-
-parameters = {
-    'Tree density': 0.75,
-    'probSpread': 0.08,
-    'tree_burn_time': 8,
-    'tree_growth_rate': 0.01,
-    'humidity': 0.3,
-    'southWindSpeed': 1,
-    'westWindSpeed': 1,
-    'bigJump': False,
-    'size': 50,
-    'steps': 200,
-    'seed': 0,
-    'num_firefighters': 30,
-    'max_water': 50,
-    'sensor_range': 2,
-    'base_speed': 3,
-    'extinguish_time': 1,
-    'num_drones': 5,
-    'drone_max_water': 30,
-    'drone_speed': 3,
-    'drone_sensor_range': 7,
-    'drone_max_battery': 80,
-    'drone_battery_warning': 10,
-    'drone_extinguish_time': 1,
-    'drone_water_drop': 5,
-    'debug_mode': True
-}
-
-
-log_model = ForestModel(parameters)
-log_model.run()
-
-if log_model.firefighter_debug_logs:
-    ff_logs = [
-        {
-            "firefighter_id": log["firefighter_id"],
-            "detected_fires": ";".join([f"({x},{y})" for x, y in log["detected_fires"]]),
-            "time": log["time"]
-        }
-        for log in log_model.firefighter_debug_logs if "detected_fires" in log
-    ]
-    if ff_logs:
-        pd.DataFrame(ff_logs).to_csv("firefighter_fire_logs.csv", index=False)
-        print("✅ Firefighter perception logs exported to 'firefighter_fire_logs.csv'")
+    if len(contract_frame):
+        contract_frame.to_csv("cnp_contract_logs.csv", index=False)
+        print("✅ CNP contract logs exported to 'cnp_contract_logs.csv'")
     else:
-        print("⚠️ No firefighter detections to export.")
+        print("⚠️ No contract log entries to export.")
+
+    if len(position_frame):
+        position_frame.to_csv("position_logs.csv", index=False)
+        print("✅ Agent position logs exported to 'position_logs.csv'")
+    else:
+        print("⚠️ No position logs to export.")
+
+
+def print_report(log_model):
+    for f in log_model.firefighters:
+        print(f"{f.firefighter_id} final position: {f.pos}")
+
+    print("🔥 Total contracts created:", len(log_model.fire_contracts))
 
-if log_model.drone_debug_logs:
-    pd.DataFrame(log_model.drone_debug_logs).to_csv("drone_fire_logs.csv", index=False)
-    print("✅ Drone detection logs exported to 'drone_fire_logs.csv'")
-else:
-    print("⚠️ No drone detections to log.")
+    metrics = log_model.metrics.summary(log_model)
 
-if log_model.contract_logs:
-    pd.DataFrame(log_model.contract_logs).to_csv("cnp_contract_logs.csv", index=False)
-    print("✅ CNP contract logs exported to 'cnp_contract_logs.csv'")
-else:
-    print("⚠️ No contract log entries to export.")
+    print(f"🧯 Completion Rate: {metrics['contracts_completed']}/{metrics['contracts_created']} ({metrics['completion_rate']:.2%})")
+    print(f"👥 Avg. Team Size: {metrics['avg_team_size']:.2f}, Avg. Cluster Size: {metrics['avg_cluster_size']:.2f}")
+    print(f"⏱️ Avg Time to Extinguish: {metrics['avg_time_to_extinguish']:.2f} steps")
 
-if hasattr(log_model, "position_logs") and log_model.position_logs:
-    pd.DataFrame(log_model.position_logs).to_csv("position_logs.csv", index=False)
-    print("✅ Agent position logs exported to 'position_logs.csv'")
-else:
-    print("⚠️ No position logs to export.")
+    idle = sorted(log_model.metrics.idle_timesteps(log_model), key=lambda row: row[1], reverse=True)
+    print(f"{'firefighter_id':>14}  idle_timesteps")
+    for firefighter_id, steps in idle:
+        print(f"{firefighter_id:>14}  {steps:>14}")
 
-for f in log_model.firefighters:
-    print(f"{f.firefighter_id} final position: {log_model.grid.positions[f]}")
 
-print("🔥 Total contracts created:", len(log_model.fire_contracts))
+def main(argv=None):
+    args = parse_args(argv)
+    parameters = parameters_from(args)
 
+    log_model = ForestModel(parameters)
+    log_model.run()
 
-fig, ax = plt.subplots()
-visual_model = ForestModel(parameters)
-animation = ap.animate(visual_model, fig, ax, animation_plot)
-IPython.display.display(IPython.display.HTML(animation.to_jshtml(fps=15)))
+    if args.export:
+        export_logs(log_model, parameters)
 
+    recording = None
+    if args.record and args.animation:
+        from simulation.recording import Replay
+        recording = Replay(args.record).recording()
+    elif log_model.frames:
+        recording = log_model.frames.recording()
 
-logs = pd.DataFrame(log_model.contract_logs)
+    animation = None
+    if recording:
+        animation = render_in_background(recording, "forest_fire.gif", fps=15)
 
-total = logs[logs["event"] == "created"]["task_id"].nunique()
-completed = logs[logs["event"] == "complete"]["task_id"].nunique()
-print(f"🧯 Completion Rate: {completed}/{total} ({completed/total:.2%})")
+    print_report(log_model)
 
-created = logs[logs["event"] == "created"]
-avg_team = created["team_size"].mean()
-avg_cluster = created["cluster_size"].mean()
-print(f"👥 Avg. Team Size: {avg_team:.2f}, Avg. Cluster Size: {avg_cluster:.2f}")
+    if animation:
+        print(f"🎞️ Animation written to '{animation.result()}'")
 
-assign = logs[logs["event"] == "assignment"]
-complete = logs[logs["event"] == "complete"]
-merged = pd.merge(assign, complete, on="task_id", suffixes=("_assign", "_complete"))
-merged["time_to_extinguish"] = merged["time_complete"] - merged["time_assign"]
-print(f"⏱️ Avg Time to Extinguish: {merged['time_to_extinguish'].mean():.2f} steps")
 
-idle_data = [
-    (ff.firefighter_id, log_model.t - ff.active_timesteps)
-    for ff in log_model.firefighters
-]
-idle_df = pd.DataFrame(idle_data, columns=["firefighter_id", "idle_timesteps"])
-print(idle_df.sort_values("idle_timesteps", ascending=False))
\ No newline at end of file
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+import numpy as np
+
+
+def assign_contracts(model):
+    # Global Contract Net award stage, run once per step: every open contract
+    # with bids gets team_size slots and all bidders that are not already on a
+    # contract are matched to the slots at minimum total bid (dist / water).
+    board = model.fire_contracts
+    contracts = [c for c in board.with_status("open") if c["bids"]]
+    if not contracts:
+        return
+    from scipy.optimize import linear_sum_assignment
+
+    bidders = {}
+    rows, cols, values = [], [], []
+    for j, contract in enumerate(contracts):
+        for bid in contract["bids"]:
+            firefighter_id = bid["firefighter_id"]
+            if firefighter_id not in bidders:
+                if board.assigned_to(firefighter_id):
+                    continue
+                bidders[firefighter_id] = len(bidders)
+            rows.append(bidders[firefighter_id])
+            cols.append(j)
+            values.append(bid["bid"])
+    if not bidders:
+        return
+
+    bid_matrix = np.zeros((len(bidders), len(contracts)))
+    bid_matrix[rows, cols] = values
+    has_bid = np.zeros(bid_matrix.shape, dtype=bool)
+    has_bid[rows, cols] = True
+
+    team_sizes = np.array([c["team_size"] for c in contracts])
+    slots = np.repeat(np.arange(len(contracts)), np.minimum(team_sizes, len(bidders)))
+    # A pair without a bid costs more than all bids of any award together, so
+    # the solver fills as many slots as it can and then minimises the total.
+    # A finite penalty keeps the bids above float rounding, 1e18 did not.
+    no_bid = (max(values) + 1) * (len(slots) + 1)
+    cost = np.where(has_bid, bid_matrix, no_bid)[:, slots]
+    chosen_rows, chosen_slots = linear_sum_assignment(cost)
+    won = has_bid[chosen_rows, slots[chosen_slots]]
+
+    firefighter_ids = list(bidders)
+    teams = {}
+    for i, slot in zip(chosen_rows[won], chosen_slots[won]):
+        teams.setdefault(slots[slot], []).append((cost[i, slot], firefighter_ids[i]))
+
+    for j, team in sorted(teams.items()):
+        contract = contracts[j]
+        team.sort()
+        board.assign(contract, [firefighter_id for _, firefighter_id in team], model.t)
+        model.metrics.assigned(contract, len(team), model.t)
+        for bid, firefighter_id in team:
+            model.contract_logs.append(
+                event="assignment",
+                task_id=contract["task_id"],
+                drone_id=contract["manager"],
+                assigned_to=firefighter_id,
+                bid=bid,
+                time=model.t
+            )
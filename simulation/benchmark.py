@@ -0,0 +1,216 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from ForestModel import ForestModel
+from simulation.parameters import DEFAULT_PARAMETERS
+
+SIZES = [50, 200, 500, 1000]
+DENSITIES = [0.5, 0.75]
+# (num_firefighters, num_drones)
+AGENT_COUNTS = [(10, 4), (30, 8)]
+# Drone parameters that grow with the grid, relative to the default size, so
+# drones still reach the fire in the middle and come back to the base corner
+SCALED_WITH_SIZE = ['drone_max_battery', 'drone_battery_warning', 'drone_speed', 'drone_sensor_range']
+
+# Benchmark phase -> profiler timers it is made of
+PHASES = {
+    'fire_spread': ['phase.fire'],
+    'firefighters': ['phase.firefighters'],
+    'drones': ['phase.assignment', 'phase.drones'],
+}
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Fresh-process latency targets at the default parameters: importing the
+# model, then setup plus the first step
+STARTUP_TARGETS_MS = {'import_ms': 400, 'first_step_ms': 600}
+HEAVY_MODULES = ['agentpy', 'matplotlib', 'pandas', 'IPython']
+
+STARTUP_SCRIPT = f"""
+import json, sys, time
+start = time.perf_counter()
+from ForestModel import ForestModel
+from simulation.parameters import DEFAULT_PARAMETERS
+imported = time.perf_counter()
+model = ForestModel(dict(DEFAULT_PARAMETERS, record_frames=False, debug_mode=False, log_level='none'))
+model.sim_setup()
+model.sim_step()
+stepped = time.perf_counter()
+print(json.dumps({{
+    'import_ms': 1000 * (imported - start),
+    'first_step_ms': 1000 * (stepped - imported),
+    'heavy_modules': [m for m in {HEAVY_MODULES!r} if m in sys.modules],
+}}))
+"""
+
+
+def scenarios(sizes, densities, agent_counts, steps, seed):
+    for size, density, (n_firefighters, n_drones) in itertools.product(sizes, densities, agent_counts):
+        scale = size / DEFAULT_PARAMETERS['size']
+        yield {
+            'name': f"size{size}_density{density}_ff{n_firefighters}_drones{n_drones}",
+            'size': size,
+            'Tree density': density,
+            'num_firefighters': n_firefighters,
+            'num_drones': n_drones,
+            'steps': steps,
+            'seed': seed,
+            **{key: max(DEFAULT_PARAMETERS[key], round(DEFAULT_PARAMETERS[key] * scale)) for key in SCALED_WITH_SIZE},
+        }
+
+
+def run_scenario(scenario, base):
+    parameters = dict(base)
+    parameters.update({k: v for k, v in scenario.items() if k != 'name'})
+
+    # The model imports scipy on first use; a fresh worker would otherwise
+    # time the import as part of the first step
+    import scipy.ndimage
+    import scipy.optimize
+    import scipy.sparse.csgraph
+
+    start = time.perf_counter()
+    model = ForestModel(parameters)
+    model.sim_setup()
+    setup_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    while model.running:
+        model.sim_step()
+    run_time = time.perf_counter() - start
+    model.end()
+
+    steps = max(model.t, 1)
+    logs = [model.position_logs, model.contract_logs]
+    result = dict(scenario)
+    result.update({
+        'steps_run': model.t,
+        'setup_s': setup_time,
+        'step_ms': 1000 * run_time / steps,
+        # Linux reports ru_maxrss in KiB
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'log_rows': sum(len(log) for log in logs),
+        'log_mb': sum(log.nbytes for log in logs) / 2 ** 20,
+        'contracts': len(model.fire_contracts),
+        'burned': model.reporters['Percentage of burned trees'],
+    })
+    for phase, timers in PHASES.items():
+        result[f"{phase}_ms"] = 1000 * sum(model.profiler.seconds[name] for name in timers) / steps
+    return result
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ''
+    return {
+        'commit': commit,
+        'time_stamp': time.strftime("%Y-%m-%d %H:%M:%S"),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+    }
+
+
+def measure_startup(repeats=5):
+    # Median over separate interpreters, so every run pays the imports
+    runs = [json.loads(subprocess.run([sys.executable, '-c', STARTUP_SCRIPT], cwd=ROOT, check=True,
+                                      capture_output=True, text=True).stdout)
+            for _ in range(repeats)]
+    result = {'name': 'startup', 'heavy_modules': runs[0]['heavy_modules']}
+    for key, target in STARTUP_TARGETS_MS.items():
+        result[key] = statistics.median(r[key] for r in runs)
+        result[f"{key}_target"] = target
+    return result
+
+
+def run_startup(output, repeats=5):
+    result = measure_startup(repeats)
+    result.update(environment())
+    with open(output, 'a') as f:
+        f.write(json.dumps(result) + '\n')
+    for key, target in STARTUP_TARGETS_MS.items():
+        status = 'ok' if result[key] <= target else 'OVER TARGET'
+        print(f"{key}: {result[key]:.0f} ms (target {target} ms) {status}")
+    print(f"heavy modules imported: {', '.join(result['heavy_modules']) or 'none'}")
+    return result
+
+
+def run_benchmarks(scenario_list, base, output):
+    env = environment()
+    results = []
+    with open(output, 'a') as f:
+        for scenario in scenario_list:
+            # A fresh process per scenario so peak memory is not shared
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                result = pool.submit(run_scenario, scenario, base).result()
+            result.update(env)
+            f.write(json.dumps(result) + '\n')
+            f.flush()
+            results.append(result)
+            print(f"{result['name']}: {result['step_ms']:.1f} ms/step "
+                  f"(fire {result['fire_spread_ms']:.1f}, firefighters {result['firefighters_ms']:.1f}, "
+                  f"drones {result['drones_ms']:.1f}), setup {result['setup_s']:.2f} s, "
+                  f"peak {result['peak_rss_mb']:.0f} MB, {result['log_rows']} log rows")
+    return results
+
+
+def load_results(path):
+    with open(path) as f:
+        return {r['name']: r for r in map(json.loads, f) if r.get('name')}
+
+
+def compare(baseline_path, candidate_path, metric='step_ms'):
+    baseline, candidate = load_results(baseline_path), load_results(candidate_path)
+    for name in sorted(baseline.keys() & candidate.keys()):
+        old, new = baseline[name][metric], candidate[name][metric]
+        ratio = new / old if old else float('nan')
+        print(f"{name}: {metric} {old:.2f} -> {new:.2f} ({ratio:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ForestModel on fixed-seed scenarios.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--densities', type=float, nargs='+', default=DENSITIES)
+    parser.add_argument('--agents', nargs='+', default=[f"{f}x{d}" for f, d in AGENT_COUNTS],
+                        help="firefighters x drones, e.g. 30x8")
+    parser.add_argument('--steps', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--fire-engine', default='vectorized', choices=['agents', 'vectorized', 'tiled'])
+    parser.add_argument('--output', default='benchmark_results.jsonl')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CANDIDATE'),
+                        help="compare two result files instead of running")
+    parser.add_argument('--metric', default='step_ms')
+    parser.add_argument('--startup', action='store_true',
+                        help="measure import time and first-step latency against the targets instead")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare, metric=args.metric)
+        return
+
+    if args.startup:
+        run_startup(args.output)
+        return
+
+    agent_counts = [tuple(int(n) for n in a.split('x')) for a in args.agents]
+    base = dict(DEFAULT_PARAMETERS, fire_engine=args.fire_engine, debug_mode=False, profile='phases')
+    run_benchmarks(scenarios(args.sizes, args.densities, agent_counts, args.steps, args.seed),
+                   base, args.output)
+
+
+if __name__ == '__main__':
+    main()
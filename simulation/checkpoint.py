@@ -0,0 +1,119 @@
+import pickle
+
+import numpy as np
+
+from ForestModel import ForestModel
+from simulation.fire_engine import BURNING
+
+# The tree layout is drawn from these in setup, so a restored model must keep them
+FIXED_PARAMETERS = ('size', 'Tree density', 'seed')
+# Output directories of the snapshot's run; a restored model writing there
+# would truncate its recording and overwrite its log parts
+OUTPUT_PARAMETERS = ('log_dir', 'record_dir')
+
+FIREFIGHTER_STATE = ('pos', 'water_supply', 'extinguishing_time', 'active_timesteps', 'base_station')
+DRONE_STATE = ('pos', 'battery', 'target', 'tile')
+
+
+def _copy(obj):
+    return pickle.loads(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def _agent_state(agent, attributes):
+    return {a: getattr(agent, a) for a in attributes}
+
+
+def snapshot(model):
+    # Full simulation state at model.t; logs are not part of it
+    return {
+        'parameters': dict(model.p),
+        't': model.t,
+        'condition': model.fire.condition.copy(),
+        'burn_time': model.fire.burn_time.copy(),
+        'firefighters': [_agent_state(f, FIREFIGHTER_STATE) for f in model.firefighters],
+        'drones': [_agent_state(d, DRONE_STATE) for d in model.drones],
+        'contracts': _copy(model.fire_contracts),
+        'metrics': _copy(model.metrics),
+        'water_splashes': list(model.water_splashes),
+        'random': model.random.getstate(),
+        'nprandom': model.nprandom.bit_generator.state,
+    }
+
+
+def restore(state, **overrides):
+    # Builds a model at the snapshot's time step. Overrides change parameters
+    # for the continuation, e.g. num_firefighters=40 adds ten firefighters at
+    # fresh positions. Logs are not streamed and nothing is recorded unless
+    # log_dir or record_dir are passed again.
+    for key in FIXED_PARAMETERS:
+        if key in overrides and overrides[key] != state['parameters'][key]:
+            raise ValueError(f"'{key}' cannot be changed when restoring a checkpoint")
+    for key in OUTPUT_PARAMETERS:
+        if overrides.get(key) is not None and overrides[key] == state['parameters'].get(key):
+            raise ValueError(f"'{key}' must differ from the checkpoint's {key}")
+
+    parameters = dict(state['parameters'], **{key: None for key in OUTPUT_PARAMETERS})
+    model = ForestModel(dict(parameters, **overrides))
+    model.sim_setup()
+    model.t = state['t']
+
+    fire = model.fire
+    fire.condition[...] = state['condition']
+    fire.burn_time[...] = state['burn_time']
+    fire.burning = set(zip(*(axis.tolist() for axis in np.nonzero(fire.condition == BURNING))))
+
+    model.fire_contracts = _copy(state['contracts'])
+    model.metrics = _copy(state['metrics'])
+    model.water_splashes = list(state['water_splashes'])
+
+    for agents, states in ((model.firefighters, state['firefighters']), (model.drones, state['drones'])):
+        for agent, agent_state in zip(agents, states):
+            for attribute, value in agent_state.items():
+                setattr(agent, attribute, value)
+    # Agents added by the overrides were placed in setup, before the restored
+    # ones moved onto their cells; they move to cells that are free now
+    for agents, states in ((model.firefighters, state['firefighters']), (model.drones, state['drones'])):
+        added = agents[len(states):]
+        for agent, cell in zip(added, model.sample_empty_cells(len(added)).tolist()):
+            agent.pos = tuple(cell)
+    # rebalance_drones moves drones between tiles, the patrol bounds follow the tile
+    for drone in model.drones:
+        drone.set_tile(drone.tile, model.tiles.bounds(drone.tile))
+
+    model.random.setstate(state['random'])
+    model.nprandom.bit_generator.state = state['nprandom']
+
+    if model.frames:
+        model.frames.frames.clear()
+        model.frames.capture()
+    if model.trajectory:
+        model.trajectory.start()
+        model.trajectory.capture()
+    return model
+
+
+def fork(model, **overrides):
+    return restore(snapshot(model), **overrides)
+
+
+def save(model, path):
+    with open(path, 'wb') as f:
+        pickle.dump(snapshot(model), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load(path, **overrides):
+    with open(path, 'rb') as f:
+        return restore(pickle.load(f), **overrides)
+
+
+def resume(model, steps=None):
+    # Model.run() would call setup() again, so restored models continue here
+    model._steps = model.p['steps'] if steps is None else model.t + steps
+    model.running = model.t < model._steps
+    while model.running:
+        model.sim_step()
+    model.end()
+    model.create_output()
+    model.output.info['completed'] = True
+    model.output.info['completed_steps'] = model.t
+    return model.output
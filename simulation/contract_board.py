@@ -0,0 +1,79 @@
+from collections import defaultdict
+
+
+class ContractBoard:
+    # Contract Net Protocol task pool. Contracts stay plain dicts (see README),
+    # the board only keeps indexes over them and archives completed ones.
+    # Awards are made for all open contracts at once (assign_contracts), so
+    # there is no index by manager drone.
+    def __init__(self):
+        self.archive = []
+        self._by_status = {"open": {}, "assigned": {}}
+        self._by_firefighter = defaultdict(dict)
+        self._by_location = defaultdict(dict)
+        # Firefighters that bid on a contract or declined it
+        self._evaluated = {}
+
+    def __len__(self):
+        return len(self.archive) + sum(len(c) for c in self._by_status.values())
+
+    def __iter__(self):
+        yield from self.archive
+        for contracts in self._by_status.values():
+            yield from list(contracts.values())
+
+    def add(self, contract):
+        task_id = contract["task_id"]
+        self._by_status[contract["status"]][task_id] = contract
+        self._by_location[contract["location"]][task_id] = contract
+        self._evaluated[task_id] = set()
+        for firefighter_id in contract["assigned"]:
+            self._by_firefighter[firefighter_id][task_id] = contract
+
+    def add_bid(self, contract, bid):
+        contract["bids"].append(bid)
+        self._evaluated[contract["task_id"]].add(bid["firefighter_id"])
+
+    def decline(self, contract, firefighter_id):
+        # No bid, e.g. on a fire the firefighter cannot reach
+        self._evaluated[contract["task_id"]].add(firefighter_id)
+
+    def has_evaluated(self, contract, firefighter_id):
+        return firefighter_id in self._evaluated[contract["task_id"]]
+
+    def assign(self, contract, firefighter_ids, time):
+        task_id = contract["task_id"]
+        del self._by_status[contract["status"]][task_id]
+        contract["assigned"] = list(firefighter_ids)
+        contract["status"] = "assigned"
+        contract["assign_time"] = time
+        self._by_status["assigned"][task_id] = contract
+        for firefighter_id in contract["assigned"]:
+            self._by_firefighter[firefighter_id][task_id] = contract
+
+    def complete(self, contract):
+        task_id = contract["task_id"]
+        del self._by_status[contract["status"]][task_id]
+        contract["status"] = "complete"
+        _discard(self._by_location, contract["location"], task_id)
+        for firefighter_id in contract["assigned"]:
+            _discard(self._by_firefighter, firefighter_id, task_id)
+        del self._evaluated[task_id]
+        self.archive.append(contract)
+
+    def with_status(self, status):
+        return list(self._by_status.get(status, {}).values())
+
+    def assigned_to(self, firefighter_id):
+        return list(self._by_firefighter.get(firefighter_id, {}).values())
+
+    def any_at(self, positions):
+        return not self._by_location.keys().isdisjoint(positions)
+
+
+def _discard(index, key, task_id):
+    contracts = index.get(key)
+    if contracts is not None:
+        contracts.pop(task_id, None)
+        if not contracts:
+            del index[key]
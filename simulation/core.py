@@ -0,0 +1,161 @@
+import random
+import sys
+from datetime import datetime
+
+import numpy as np
+
+# The subset of agentpy's Model / Agent / AgentList that ForestModel uses,
+# with the same seeding and run loop. Importing agentpy pulls in matplotlib,
+# pandas, scipy.stats and SALib, which every sweep worker paid for at startup.
+
+
+class AttrDict(dict):
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        self[name] = value
+
+
+class Output(AttrDict):
+    # Run output like agentpy's DataDict; pandas is only imported when the
+    # reporters table is read
+    @property
+    def reporters(self):
+        import pandas as pd
+        return pd.DataFrame({k: [v] for k, v in self['reporter_values'].items()})
+
+
+class Agent:
+    def __init__(self, model, *args, **kwargs):
+        self.id = model._new_id()
+        self.type = type(self).__name__
+        self.model = model
+        self.p = model.p
+        self.setup(*args, **kwargs)
+
+    def __repr__(self):
+        return f"{self.type} (Obj {self.id})"
+
+    def setup(self):
+        pass
+
+
+class AgentList(list):
+    def __init__(self, model, objs=(), cls=None, *args, **kwargs):
+        if isinstance(objs, int):
+            objs = [cls(model, *args, **kwargs) for _ in range(objs)]
+        super().__init__(objs)
+        self.model = model
+
+    def __getattr__(self, name):
+        # agents.step() calls step() on every agent, looked up per instance
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def call(*args, **kwargs):
+            return [getattr(agent, name)(*args, **kwargs) for agent in self]
+        return call
+
+
+class Model:
+    def __init__(self, parameters=None, **kwargs):
+        self.p = AttrDict(parameters or {})
+        self._id_counter = -1
+        self.id = self._new_id()
+        self.type = type(self).__name__
+        self.model = self
+
+        self.t = 0
+        self.running = False
+        self.random = random.Random()
+        self.nprandom = np.random.default_rng()
+
+        self.reporters = {}
+        self.output = Output(info={
+            'model_type': self.type,
+            'time_stamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'python_version': sys.version[:5],
+            'completed': False,
+        })
+
+        self._steps = None
+        self._partly_run = False
+        self._setup_kwargs = kwargs
+
+    def __repr__(self):
+        return self.type
+
+    def _new_id(self):
+        self._id_counter += 1
+        return self._id_counter
+
+    def report(self, key, value):
+        self.reporters[key] = value
+
+    def setup(self):
+        pass
+
+    def step(self):
+        pass
+
+    def update(self):
+        pass
+
+    def end(self):
+        pass
+
+    def sim_setup(self, steps=None, seed=None):
+        if not self._partly_run:
+            if seed is None:
+                seed = self.p['seed'] if 'seed' in self.p else random.getrandbits(128)
+            if self.p.get('report_seed', True):
+                self.report('seed', seed)
+            self.random = random.Random(seed)
+            self.nprandom = np.random.default_rng(seed=self.random.getrandbits(128))
+
+        if steps is None:
+            self._steps = self.p['steps'] if 'steps' in self.p else np.nan
+        else:
+            self._steps = self.t + steps
+
+        self.running = True
+        self._partly_run = True
+        self.setup(**self._setup_kwargs)
+        self.update()
+        if self.t >= self._steps:
+            self.running = False
+
+    def sim_step(self):
+        self.t += 1
+        self.step()
+        self.update()
+        if self.t >= self._steps:
+            self.running = False
+
+    def stop(self):
+        self.running = False
+
+    def run(self, steps=None, seed=None, display=True):
+        start = datetime.now()
+        self.sim_setup(steps, seed)
+        while self.running:
+            self.sim_step()
+            if display:
+                print(f"\rCompleted: {self.t} steps", end='')
+        self.end()
+        self.create_output()
+        self.output.info['completed'] = True
+        self.output.info['created_objects'] = self._id_counter
+        self.output.info['completed_steps'] = self.t
+        self.output.info['run_time'] = run_time = str(datetime.now() - start)
+        if display:
+            print(f"\nRun time: {run_time}\nSimulation finished")
+        return self.output
+
+    def create_output(self):
+        self.output['parameters'] = AttrDict(constants=dict(self.p))
+        self.output['reporter_values'] = dict(self.reporters)
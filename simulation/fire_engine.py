@@ -0,0 +1,202 @@
+import numpy as np
+
+from agents.tree_agent import Tree
+
+from simulation.spatial import cells_within
+
+NO_TREE = 255
+ALIVE, BURNING, BURNED = 0, 1, 2
+
+# Fire clusters are 4-connected, like the drones' former BFS
+CLUSTER_STRUCTURE = np.array([[0, 1, 0], [1, 1, 1], [0, 1, 0]], dtype=bool)
+
+NEIGHBOR_OFFSETS = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy]
+
+# Wind factor of Alexandridis et al. (2008), exp(c1 V) * exp(c2 V (cos(theta) - 1)),
+# with V the wind speed in m/s and theta the angle between wind and spread
+WIND_C1, WIND_C2 = 0.045, 0.131
+
+
+def spread_kernel(p):
+    # Ignition probability per offset from a burning cell, as (dx, dy, prob)
+    # arrays: the Moore neighbors in row-major order, then the ember cells.
+    # Rows grow southwards and columns eastwards as drawn, so a south wind
+    # blows towards lower rows. Without wind and humidity every neighbor gets
+    # probSpread.
+    base = p.get('probSpread', 0.2) * (1.0 - p.get('humidity', 0.0))
+    wind = np.array([-p.get('southWindSpeed', 0), p.get('westWindSpeed', 0)], dtype=float)
+    speed = float(np.hypot(*wind))
+
+    offsets = np.array(NEIGHBOR_OFFSETS, dtype=np.int64)
+    cos = np.ones(len(offsets))
+    if speed:
+        cos = offsets @ wind / (speed * np.hypot(offsets[:, 0], offsets[:, 1]))
+    prob = base * np.exp(WIND_C1 * speed + WIND_C2 * speed * (cos - 1.0))
+
+    if p.get('bigJump', False) and speed:
+        # Embers land straight downwind 2 to jumpDistance cells away, with an
+        # inverse-square share of the downwind probability
+        direction = wind / np.abs(wind).max()
+        distance = np.arange(2, p.get('jumpDistance', 4) + 1)
+        embers = np.rint(np.outer(distance, direction)).astype(np.int64)
+        offsets = np.concatenate([offsets, embers])
+        prob = np.concatenate([prob, base * np.exp(WIND_C1 * speed) / distance ** 2])
+
+    return offsets[:, 0], offsets[:, 1], np.clip(prob, 0.0, 1.0)
+
+
+def ignition_targets(sources, kernel, bounds, cols):
+    # Flat cells within bounds reached from the burning sources, with the
+    # chance that any of their independent draws ignites them. The chances
+    # are combined in log space, so k draws of p give 1 - (1 - p)^k.
+    r0, r1, c0, c1 = bounds
+    targets, misses = [], []
+    with np.errstate(divide='ignore'):
+        log_miss = np.log1p(-kernel[2])
+    for dx, dy, miss in zip(kernel[0].tolist(), kernel[1].tolist(), log_miss.tolist()):
+        x, y = sources[:, 0] + dx, sources[:, 1] + dy
+        inside = (x >= r0) & (x < r1) & (y >= c0) & (y < c1)
+        targets.append(x[inside] * cols + y[inside])
+        misses.append(np.full(np.count_nonzero(inside), miss))
+    flat, inverse = np.unique(np.concatenate(targets), return_inverse=True)
+    prob = -np.expm1(np.bincount(inverse, weights=np.concatenate(misses), minlength=flat.size))
+    return flat, prob
+
+
+class FireEngine:
+    def __init__(self, model, shape):
+        self.model = model
+        self.shape = tuple(shape)
+        self.kernel = spread_kernel(model.p)
+        self.kernel_radius = int(max(np.abs(self.kernel[0]).max(), np.abs(self.kernel[1]).max()))
+        self._kernel_offsets = list(zip(*(axis.tolist() for axis in self.kernel)))
+        self.tree_burn_time = model.p.get('tree_burn_time', 8)
+
+        # One byte of condition per cell, the smallest signed int that holds a
+        # burn timer and one bit of tree presence; Tree agents only exist for
+        # cells that agent code has asked for
+        self.condition = np.full(self.shape, NO_TREE, dtype=np.uint8)
+        timer = np.int8 if self.tree_burn_time <= np.iinfo(np.int8).max else np.int16
+        self.burn_time = np.zeros(self.shape, dtype=timer)
+        self.tree_mask = np.zeros((self.shape[0], (self.shape[1] + 7) // 8), dtype=np.uint8)
+        self.n_trees = 0
+        self._trees = {}
+
+        # Cells currently on fire, kept in sync with every condition change
+        self.burning = set()
+
+        # Connected-component labels of the burning cells over their bounding box
+        self.labels = np.zeros((0, 0), dtype=np.int32)
+        self.labels_origin = (0, 0)
+
+    def plant(self, trees):
+        # Alive trees where the boolean grid is set
+        self.condition[trees] = ALIVE
+        self.burn_time[trees] = self.tree_burn_time
+        self.tree_mask = np.packbits(self.condition != NO_TREE, axis=1)
+        self.n_trees += int(np.count_nonzero(trees))
+
+    def has_tree(self, x, y):
+        # Works on single cells and on index arrays
+        return (self.tree_mask[x, np.right_shift(y, 3)] >> (7 - np.bitwise_and(y, 7))) & 1 == 1
+
+    def tree(self, cell):
+        tree = self._trees.get(cell)
+        if tree is None:
+            tree = self._trees[cell] = Tree(self.model, cell)
+        return tree
+
+    def spread_targets(self, cell):
+        # Trees the kernel reaches from cell, with their ignition probability
+        rows, cols = self.shape
+        x, y = cell
+        for dx, dy, prob in self._kernel_offsets:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < rows and 0 <= ny < cols and self.has_tree(nx, ny):
+                yield self.tree((nx, ny)), prob
+
+    def close(self):
+        pass
+
+    def set_condition(self, cell, value):
+        self.condition[cell] = value
+        if value == BURNING:
+            self.burning.add(cell)
+        else:
+            self.burning.discard(cell)
+
+    def burning_trees(self):
+        # Sorted so the per-Tree draws do not depend on the set's history
+        return [self.tree(cell) for cell in sorted(self.burning)]
+
+    def burning_within(self, pos, radius):
+        # Burning cells within radius of pos, nearest first
+        x, y, _ = cells_within(pos, radius, self.shape)
+        hit = self.condition[x, y] == BURNING
+        return list(zip(x[hit].tolist(), y[hit].tolist()))
+
+    def label_clusters(self):
+        from scipy import ndimage
+
+        if not self.burning:
+            self.labels = np.zeros((0, 0), dtype=np.int32)
+            return
+        cells = self.burning_cells()
+        low = cells.min(axis=0)
+        high = cells.max(axis=0) + 1
+        window = self.condition[low[0]:high[0], low[1]:high[1]] == BURNING
+        self.labels, _ = ndimage.label(window, structure=CLUSTER_STRUCTURE)
+        self.labels_origin = (int(low[0]), int(low[1]))
+
+    def clusters_of(self, cells):
+        # Groups cells by their label from label_clusters(), keeping their order
+        ox, oy = self.labels_origin
+        rows, cols = self.labels.shape
+        clusters = {}
+        for cell in cells:
+            x, y = cell[0] - ox, cell[1] - oy
+            label = self.labels[x, y] if 0 <= x < rows and 0 <= y < cols else 0
+            key = int(label) if label else cell
+            clusters.setdefault(key, []).append(cell)
+        return list(clusters.values())
+
+    def count(self, condition):
+        return int(np.count_nonzero(self.condition == condition))
+
+    def ignition_probability(self, cells):
+        # Alive cells the kernel reaches from the burning cells, with their
+        # chance to ignite this step
+        rows, cols = self.shape
+        flat, prob = ignition_targets(cells, self.kernel, (0, rows, 0, cols), cols)
+        alive = self.condition.ravel()[flat] == ALIVE
+        return np.divmod(flat[alive], cols), prob[alive]
+
+    def burning_cells(self):
+        return np.array(list(self.burning), dtype=np.int64).reshape(-1, 2)
+
+    def spread_trees(self, trees):
+        # Reference per-Tree spread, one random draw per tree in the kernel
+        for tree in trees:
+            tree.spreadFire()
+            tree.burnOut()
+
+    def spread(self, cells):
+        if not len(cells):
+            return
+
+        # Every burning cell gets one independent chance per kernel offset, as
+        # in the per-Tree spread, but drawn once per candidate cell
+        candidates, prob = self.ignition_probability(cells)
+        ignited = self.model.nprandom.random(prob.size) < prob
+        ignited = tuple(axis[ignited] for axis in candidates)
+
+        burning = (cells[:, 0], cells[:, 1])
+        self.burn_time[burning] -= 1
+        burned = self.burn_time[burning] <= 0
+        burned = tuple(axis[burned] for axis in burning)
+        self.condition[burned] = BURNED
+        self.burning.difference_update(zip(*(axis.tolist() for axis in burned)))
+
+        self.condition[ignited] = BURNING
+        self.burn_time[ignited] = self.tree_burn_time
+        self.burning.update(zip(*(axis.tolist() for axis in ignited)))
@@ -0,0 +1,119 @@
+import numpy as np
+
+
+class Fleet:
+    # Struct-of-arrays state of one kind of mobile agent. Each agent is a view
+    # on its row; moves requested during a phase are applied in one batch.
+    def __init__(self, model, n, speed):
+        self.model = model
+        self.agents = []
+        self.positions = np.zeros((n, 2), dtype=np.int64)
+        self.targets = np.zeros((n, 2), dtype=np.int64)
+        self.moving = np.zeros(n, dtype=bool)
+        self.speed = np.full(n, speed, dtype=np.int64)
+
+    def register(self, agent):
+        self.agents.append(agent)
+        return len(self.agents) - 1
+
+    def place(self, cells):
+        cells = np.array(cells, dtype=np.int64).reshape(-1, 2)
+        self.positions[:len(cells)] = cells
+        np.add.at(self.model.occupancy, tuple(cells.T), 1)
+
+    def position(self, index):
+        return tuple(self.positions[index].tolist())
+
+    def set_position(self, index, cell):
+        self._relocate(np.array([index]), np.array([cell], dtype=np.int64))
+
+    def request_move(self, index, target):
+        # A later request in the same phase replaces an earlier one
+        self.targets[index] = target
+        self.moving[index] = True
+
+    def request_moves(self, indexes, targets):
+        self.targets[indexes] = targets
+        self.moving[indexes] = True
+
+    def _movers(self):
+        movers = np.nonzero(self.moving)[0]
+        self.moving[:] = False
+        return movers
+
+    def _relocate(self, movers, cells):
+        occupancy = self.model.occupancy
+        np.subtract.at(occupancy, tuple(self.positions[movers].T), 1)
+        np.add.at(occupancy, tuple(cells.T), 1)
+        self.positions[movers] = cells
+
+
+class DroneFleet(Fleet):
+    def __init__(self, model, n):
+        super().__init__(model, n, model.p.drone_speed)
+        self.battery = np.full(n, model.p.drone_max_battery, dtype=np.float64)
+
+    def move(self):
+        # Straight to the target when within speed, else speed cells along each
+        # axis; the flown distance is taken from the battery
+        movers = self._movers()
+        if not len(movers):
+            return
+        pos, target = self.positions[movers], self.targets[movers]
+        direction = target - pos
+        speed = self.speed[movers, None]
+        arrived = np.hypot(direction[:, 0], direction[:, 1])[:, None] <= speed
+        new = np.where(arrived, target, pos + np.sign(direction) * speed)
+        new = np.clip(new, 0, self.model.p.size - 1)
+        step = new - pos
+        self.battery[movers] -= np.hypot(step[:, 0], step[:, 1])
+        self._relocate(movers, new)
+
+
+class FirefighterFleet(Fleet):
+    def __init__(self, model, n):
+        super().__init__(model, n, model.p.base_speed)
+        self.water = np.full(n, model.p.max_water, dtype=np.int64)
+        self.routes = {}
+
+    def request_move(self, index, target):
+        self.routes.pop(index, None)
+        super().request_move(index, target)
+
+    def request_moves(self, indexes, targets):
+        for index in indexes.tolist():
+            self.routes.pop(index, None)
+        super().request_moves(indexes, targets)
+
+    def request_route(self, index, field):
+        # Follow a Navigator distance field instead of the straight line
+        self.routes[index] = field
+        self.moving[index] = True
+
+    def move(self):
+        movers = self._movers()
+        routed = np.isin(movers, list(self.routes))
+        navigation = self.model.navigation
+        for index in movers[routed].tolist():
+            cell = navigation.hop(self.position(index), self.routes[index], self.model.occupancy)
+            self.set_position(index, cell)
+        self.routes.clear()
+
+        # The rest move speed cells along each axis towards the target, only
+        # onto a cell that is inside the grid, has no tree and no agent; if
+        # several firefighters pick the same cell the first one wins
+        movers = movers[~routed]
+        if not len(movers):
+            return
+        pos = self.positions[movers]
+        new = pos + np.sign(self.targets[movers] - pos) * self.speed[movers, None]
+        size = self.model.p.size
+        inside = ((new >= 0) & (new < size)).all(axis=1)
+        movers, new = movers[inside], new[inside]
+
+        x, y = new[:, 0], new[:, 1]
+        free = ~self.model.fire.has_tree(x, y) & (self.model.occupancy[x, y] == 0)
+        movers, new = movers[free], new[free]
+
+        _, first = np.unique(new[:, 0] * size + new[:, 1], return_index=True)
+        self._relocate(movers[first], new[first])
@@ -0,0 +1,89 @@
+import json
+import os
+import shutil
+
+import numpy as np
+
+from simulation.log_sink import ColumnarLog, to_frame
+
+
+class StreamingExporter:
+    # Flushes the model logs to `directory` every `every` steps so memory stays
+    # bounded. Columnar logs become numbered .npz parts plus a manifest that is
+    # only updated once a part is complete, list logs are appended as JSON lines.
+    def __init__(self, directory, logs, every=10):
+        self.directory = directory
+        self.logs = logs
+        self.every = every
+        self.parts = {name: 0 for name in logs}
+        os.makedirs(directory, exist_ok=True)
+        # Parts restart at part-00000 and records are appended, so the output
+        # of an earlier run into the same directory goes first
+        for name, log in logs.items():
+            if isinstance(log, ColumnarLog):
+                shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+            elif os.path.exists(os.path.join(directory, f"{name}.jsonl")):
+                os.remove(os.path.join(directory, f"{name}.jsonl"))
+
+    def step(self, t):
+        if t % self.every == 0:
+            self.flush()
+
+    def flush(self):
+        for name, log in self.logs.items():
+            if isinstance(log, ColumnarLog):
+                self._flush_columns(name, log)
+            else:
+                self._flush_records(name, log)
+
+    def _flush_columns(self, name, log):
+        if not log:
+            return
+        folder = os.path.join(self.directory, name)
+        os.makedirs(folder, exist_ok=True)
+        np.savez(os.path.join(folder, f"part-{self.parts[name]:05d}.npz"), **log.drain())
+        self.parts[name] += 1
+
+        manifest = {
+            'columns': {column: dtype.str for column, dtype in log.dtypes.items()},
+            'categories': log.categories,
+            'parts': self.parts[name],
+        }
+        path = os.path.join(folder, 'manifest.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(manifest, f)
+        os.replace(path + '.tmp', path)
+
+    def _flush_records(self, name, records):
+        if not records:
+            return
+        with open(os.path.join(self.directory, f"{name}.jsonl"), 'a') as f:
+            for record in records:
+                f.write(json.dumps(record, default=int) + '\n')
+        records.clear()
+
+
+def read_log(directory, name):
+    # Loads the parts written so far, also while the simulation is still running
+    folder = os.path.join(directory, name)
+    if not os.path.exists(os.path.join(folder, 'manifest.json')):
+        # Nothing flushed yet, or the log is switched off
+        return to_frame({}, {})
+    with open(os.path.join(folder, 'manifest.json')) as f:
+        manifest = json.load(f)
+
+    parts = [np.load(os.path.join(folder, f"part-{i:05d}.npz")) for i in range(manifest['parts'])]
+    columns = {
+        column: np.concatenate([part[column] for part in parts]) if parts else np.empty(0, dtype)
+        for column, dtype in manifest['columns'].items()
+    }
+    return to_frame(columns, manifest['categories'])
+
+
+def read_records(directory, name):
+    # The JSON lines of a list log such as drone_debug_logs
+    path = os.path.join(directory, f"{name}.jsonl")
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f]
@@ -0,0 +1,142 @@
+import numpy as np
+
+CATEGORY = 'category'
+
+POSITION_COLUMNS = {
+    'time': np.int32,
+    'agent_id': CATEGORY,
+    'type': CATEGORY,
+    'x': np.int32,
+    'y': np.int32,
+}
+
+CONTRACT_COLUMNS = {
+    'event': CATEGORY,
+    'task_id': CATEGORY,
+    'time': np.int32,
+    'x': np.int32,
+    'y': np.int32,
+    'cluster_size': np.int32,
+    'team_size': np.int32,
+    'drone_id': CATEGORY,
+    'firefighter_id': CATEGORY,
+    'assigned_to': CATEGORY,
+    'bid': np.float64,
+    'distance': np.float64,
+    'water': np.float64,
+}
+
+LOG_LEVELS = ('none', 'contracts', 'all')
+
+
+def _missing(dtype):
+    return np.nan if np.issubdtype(dtype, np.floating) else -1
+
+
+def to_frame(columns, categories):
+    # Category codes become categoricals and the -1 in integer columns
+    # becomes <NA>, as the missing keys of the former dict rows did
+    import pandas as pd
+
+    data = {}
+    for name, values in columns.items():
+        if name in categories:
+            values = pd.Categorical.from_codes(values, categories=categories[name])
+        elif np.issubdtype(values.dtype, np.integer):
+            values = pd.arrays.IntegerArray(values, values == -1)
+        data[name] = values
+    return pd.DataFrame(data, copy=False)
+
+
+class ColumnarLog:
+    # Struct-of-arrays event log. Rows are written into preallocated typed
+    # chunks, string columns are interned to int32 codes.
+    def __init__(self, columns, chunk_size=8192, enabled=True):
+        self.enabled = enabled
+        self.chunk_size = chunk_size
+        self.dtypes = {
+            name: np.dtype(np.int32 if dtype == CATEGORY else dtype)
+            for name, dtype in columns.items()
+        }
+        self.categories = {name: [] for name, dtype in columns.items() if dtype == CATEGORY}
+        self._codes = {name: {} for name in self.categories}
+        self._defaults = {name: _missing(dtype) for name, dtype in self.dtypes.items()}
+        self._chunks = []
+        self._new_chunk()
+
+    def _new_chunk(self):
+        self._current = {
+            name: np.full(self.chunk_size, self._defaults[name], dtype=dtype)
+            for name, dtype in self.dtypes.items()
+        }
+        self._filled = 0
+
+    def intern(self, column, value):
+        codes = self._codes[column]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(self.categories[column])
+            self.categories[column].append(value)
+        return code
+
+    def append(self, **fields):
+        if not self.enabled:
+            return
+        row = self._filled
+        for name, value in fields.items():
+            if name in self._codes:
+                value = self.intern(name, value)
+            self._current[name][row] = value
+        self._filled += 1
+        if self._filled == self.chunk_size:
+            self._chunks.append(self._current)
+            self._new_chunk()
+
+    def extend(self, n, **fields):
+        # n rows at once; a field is one value for all rows or one per row
+        if not self.enabled or not n:
+            return
+        for name, values in fields.items():
+            if name in self._codes:
+                if isinstance(values, str):
+                    fields[name] = self.intern(name, values)
+                else:
+                    fields[name] = np.array([self.intern(name, v) for v in values], dtype=np.int32)
+        start = 0
+        while start < n:
+            take = min(n - start, self.chunk_size - self._filled)
+            rows = slice(self._filled, self._filled + take)
+            for name, values in fields.items():
+                self._current[name][rows] = values if np.ndim(values) == 0 else values[start:start + take]
+            start += take
+            self._filled += take
+            if self._filled == self.chunk_size:
+                self._chunks.append(self._current)
+                self._new_chunk()
+
+    def __len__(self):
+        return len(self._chunks) * self.chunk_size + self._filled
+
+    def __bool__(self):
+        return len(self) > 0
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for chunk in self._chunks + [self._current] for a in chunk.values())
+
+    def columns(self):
+        # One array per column; a single chunk is returned as a view
+        parts = self._chunks + [{name: a[:self._filled] for name, a in self._current.items()}]
+        if len(parts) == 1:
+            return parts[0]
+        return {name: np.concatenate([p[name] for p in parts]) for name in self.dtypes}
+
+    def drain(self):
+        # Hands out the buffered rows and starts over; interned codes stay stable
+        columns = self.columns()
+        self._chunks = []
+        self._new_chunk()
+        return columns
+
+    def to_frame(self):
+        return to_frame(self.columns(), self.categories)
@@ -0,0 +1,57 @@
+class ContractMetrics:
+    # Contract KPIs updated as the events happen instead of from the full
+    # contract log after the run. Only contracts that are not completed yet
+    # keep state: their number of assignments and the sum of assign times.
+    def __init__(self):
+        self.created_count = 0
+        self.completed_count = 0
+        self.team_size_total = 0
+        self.cluster_size_total = 0
+        self.extinguish_time_total = 0
+        self.extinguish_pairs = 0
+        self._assignments = {}
+        self.history = []
+
+    def created(self, contract):
+        self.created_count += 1
+        self.team_size_total += contract["team_size"]
+        self.cluster_size_total += len(contract["cluster"])
+
+    def assigned(self, contract, n, time):
+        entry = self._assignments.setdefault(contract["task_id"], [0, 0])
+        entry[0] += n
+        entry[1] += n * time
+
+    def completed(self, contract, time):
+        # Every assignment of the contract counts once, as in a merge of the
+        # assignment and complete events on task_id
+        count, time_total = self._assignments.pop(contract["task_id"], (0, 0))
+        self.completed_count += 1
+        self.extinguish_time_total += count * time - time_total
+        self.extinguish_pairs += count
+
+    @staticmethod
+    def idle_timesteps(model):
+        return [(f.firefighter_id, model.t - f.active_timesteps) for f in model.firefighters]
+
+    def summary(self, model):
+        def mean(total, n):
+            return total / n if n else float('nan')
+
+        idle = [steps for _, steps in self.idle_timesteps(model)]
+        return {
+            'contracts_created': self.created_count,
+            'contracts_completed': self.completed_count,
+            'completion_rate': mean(self.completed_count, self.created_count),
+            'avg_team_size': mean(self.team_size_total, self.created_count),
+            'avg_cluster_size': mean(self.cluster_size_total, self.created_count),
+            'avg_time_to_extinguish': mean(self.extinguish_time_total, self.extinguish_pairs),
+            'avg_idle_timesteps': mean(sum(idle), len(idle)),
+        }
+
+    def record(self, model):
+        self.history.append(dict(self.summary(model), t=model.t))
+
+    def to_frame(self):
+        import pandas as pd
+        return pd.DataFrame(self.history)
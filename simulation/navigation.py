@@ -0,0 +1,102 @@
+import threading
+
+import numpy as np
+
+from simulation.spatial import cells_within
+
+
+class Navigator:
+    # Distance fields for firefighters over the cells they can stand on (no
+    # tree). A move hops up to base_speed cells along each axis, over trees,
+    # as the straight-line move does. The field of one or more fire cells
+    # holds the path length to the nearest cell within sensor range of any of
+    # them, np.inf where no such path exists. Trees never disappear, so a
+    # field stays valid for as long as its cells are the target; fields nobody
+    # asked for during a step are dropped.
+    def __init__(self, model):
+        self.model = model
+        self.shape = model.fire.shape
+        self.reach = model.p.sensor_range
+        self.speed = model.p.base_speed
+        self.fields = {}
+        self.used = set()
+        self.graph = None
+        # Decisions may ask for fields from several threads
+        self.lock = threading.Lock()
+
+    def build(self):
+        # Built on the first field request, runs without contracts never pay for it
+        from scipy.sparse import csr_matrix
+
+        rows, cols = self.shape
+        trees = np.unpackbits(self.model.fire.tree_mask, axis=1, count=cols).astype(bool)
+        self.node = np.full(self.shape, -1, dtype=np.int64)
+        self.node[~trees] = np.arange(np.count_nonzero(~trees))
+
+        s = self.speed
+        dx, dy = np.mgrid[-s:s + 1, -s:s + 1]
+        self.hops = np.hypot(dx, dy)
+
+        src, dst, length = [], [], []
+        for dx, dy in zip(dx.ravel().tolist(), dy.ravel().tolist()):
+            if not dx and not dy:
+                continue
+            x0, x1 = max(0, -dx), rows - max(0, dx)
+            y0, y1 = max(0, -dy), cols - max(0, dy)
+            a = self.node[x0:x1, y0:y1]
+            b = self.node[x0 + dx:x1 + dx, y0 + dy:y1 + dy]
+            linked = (a >= 0) & (b >= 0)
+            src.append(a[linked])
+            dst.append(b[linked])
+            length.append(np.full(np.count_nonzero(linked), np.hypot(dx, dy)))
+        n = int(self.node.max()) + 1
+        self.graph = csr_matrix((np.concatenate(length), (np.concatenate(src), np.concatenate(dst))),
+                                shape=(n, n))
+
+    def field(self, *cells):
+        self.used.add(cells)
+        field = self.fields.get(cells)
+        if field is None:
+            with self.lock:
+                field = self.fields.get(cells)
+                if field is None:
+                    field = self.fields[cells] = self._compute(cells)
+        return field
+
+    def _compute(self, cells):
+        if self.graph is None:
+            self.build()
+        from scipy.sparse.csgraph import dijkstra
+        goals = np.unique(np.concatenate([self.node[cells_within(cell, self.reach, self.shape)[:2]]
+                                          for cell in cells]))
+        goals = goals[goals >= 0]
+        if not len(goals):
+            return np.full(self.graph.shape[0], np.inf)
+        return dijkstra(self.graph, indices=goals, min_only=True)
+
+    def distance(self, pos, *cells):
+        # Path length from pos until one of cells is within sensor range
+        return float(self.field(*cells)[self.node[pos]])
+
+    def hop(self, pos, field, occupancy):
+        # The free cell within one move that lies on the shortest remaining
+        # path; pos itself when no free cell gets closer
+        rows, cols = self.shape
+        s = self.speed
+        x, y = pos
+        x0, y0 = max(x - s, 0), max(y - s, 0)
+        x1, y1 = min(x + s + 1, rows), min(y + s + 1, cols)
+        nodes = self.node[x0:x1, y0:y1]
+        free = (nodes >= 0) & (occupancy[x0:x1, y0:y1] == 0)
+        remaining = np.where(free, field[nodes], np.inf)
+        closer = remaining < field[self.node[x, y]]
+        if not closer.any():
+            return pos
+        cost = np.where(closer, remaining + self.hops[x0 - x + s:x1 - x + s, y0 - y + s:y1 - y + s], np.inf)
+        i, j = np.unravel_index(np.argmin(cost), cost.shape)
+        return x0 + int(i), y0 + int(j)
+
+    def end_step(self):
+        for cell in set(self.fields) - self.used:
+            del self.fields[cell]
+        self.used.clear()
@@ -0,0 +1,40 @@
+DEFAULT_PARAMETERS = {
+    'Tree density': 0.75,
+    'probSpread': 0.08,
+    'tree_burn_time': 8,
+    'tree_growth_rate': 0.01,
+    'fire_engine': 'agents',  # 'agents' (per-Tree), 'vectorized' or 'tiled' (one process per tile)
+    'tiles': (2, 2),  # tile rows x columns for the tiled engine and the drones' patrol areas
+    'humidity': 0.3,
+    'southWindSpeed': 1,
+    'westWindSpeed': 1,
+    'bigJump': False,  # embers also land up to jumpDistance cells downwind
+    'jumpDistance': 4,
+    'size': 50,
+    'steps': 200,
+    'seed': 0,
+    'num_firefighters': 30,
+    'max_water': 50,
+    'sensor_range': 2,
+    'base_speed': 3,
+    'extinguish_time': 1,
+    'num_drones': 5,
+    'drone_max_water': 30,
+    'drone_speed': 3,
+    'drone_sensor_range': 7,
+    'drone_max_battery': 80,
+    'drone_battery_warning': 10,
+    'drone_extinguish_time': 1,
+    'drone_water_drop': 5,
+    'log_level': 'all',  # 'all', 'contracts' (no position logs) or 'none'
+    'log_dir': None,  # stream logs to this folder while running
+    'log_flush_every': 10,
+    'scheduler': 'all',  # 'all' ticks every agent, 'event' only busy ones and stops when the fire is out,
+                         # 'two_phase' lets all agents decide before any decision is applied
+    'decision_workers': 0,  # threads for the 'two_phase' decisions, 0 decides in the model's thread
+    'record_frames': False,  # keep per-step snapshots for the animation (main.py turns it on)
+    'record_dir': None,  # write a compact recording to this folder, read it with simulation.recording.Replay
+    'record_keyframe_every': 50,
+    'profile': False,  # True times phases and agent methods, 'phases' only the step phases
+    'debug_mode': True
+}
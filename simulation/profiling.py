@@ -0,0 +1,74 @@
+from collections import defaultdict
+from time import perf_counter
+
+MODEL_PHASES = {
+    'fire_phase': 'phase.fire',
+    'firefighter_phase': 'phase.firefighters',
+    'assignment_phase': 'phase.assignment',
+    'drone_phase': 'phase.drones',
+}
+
+FIRE_METHODS = {
+    'burning_cells': 'fire.burning_selection',
+    'burning_trees': 'fire.burning_selection',
+    'spread': 'fire.spread_burnout',
+    'spread_trees': 'fire.spread_burnout',
+    'label_clusters': 'fire.clustering',
+}
+
+DRONE_METHODS = ['step', 'decide', 'apply', 'perceive_fire', 'cluster_fires', 'contract_exists', 'move_towards']
+FIREFIGHTER_METHODS = ['step', 'decide', 'apply', 'move_towards_fire', 'extinguish_fire']
+
+
+class Profiler:
+    # Call counts and cumulative wall time of wrapped methods. Wrapping is done
+    # per instance, so a model without a profiler runs the plain methods.
+    def __init__(self):
+        self.calls = defaultdict(int)
+        self.seconds = defaultdict(float)
+        self.timeline = []
+        self._last = {}
+
+    def wrap(self, name, func):
+        calls, seconds = self.calls, self.seconds
+
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                seconds[name] += perf_counter() - start
+                calls[name] += 1
+
+        return timed
+
+    def instrument(self, obj, methods):
+        for method, name in methods.items():
+            setattr(obj, method, self.wrap(name, getattr(obj, method)))
+
+    def end_step(self, t):
+        # Adds this step's calls and time per name to the timeline
+        for name, calls in self.calls.items():
+            last_calls, last_seconds = self._last.get(name, (0, 0.0))
+            if calls > last_calls:
+                self.timeline.append((t, name, calls - last_calls, self.seconds[name] - last_seconds))
+                self._last[name] = (calls, self.seconds[name])
+
+    def summary(self):
+        rows = [(name, self.calls[name], self.seconds[name]) for name in self.calls]
+        return sorted(rows, key=lambda row: row[2], reverse=True)
+
+    def to_frame(self):
+        import pandas as pd
+
+        return pd.DataFrame(self.timeline, columns=['t', 'name', 'calls', 'seconds'])
+
+
+def instrument_model(profiler, model, agents=True):
+    profiler.instrument(model, MODEL_PHASES)
+    profiler.instrument(model.fire, FIRE_METHODS)
+    if agents:
+        for drone in model.drones:
+            profiler.instrument(drone, {m: f"Drone.{m}" for m in DRONE_METHODS})
+        for firefighter in model.firefighters:
+            profiler.instrument(firefighter, {m: f"Firefighter.{m}" for m in FIREFIGHTER_METHODS})
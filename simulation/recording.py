@@ -0,0 +1,288 @@
+import json
+import os
+
+import numpy as np
+
+from simulation.fire_engine import ALIVE
+from simulation.render import recent_splashes
+
+MANIFEST = 'recording.json'
+
+# One row per recorded step; the *_end columns are running totals, so the
+# entries of step i in a stream are [end[i - 1], end[i])
+STEP_DTYPE = np.dtype([
+    ('t', '<i4'),
+    ('alive', '<i4'),
+    ('delta_end', '<i8'),
+    ('splash_end', '<i8'),
+    ('contract_end', '<i8'),
+])
+
+CONTRACT_EVENTS = ('created', 'assigned', 'completed')
+CONTRACT_DTYPE = np.dtype([
+    ('t', '<i4'),
+    ('event', 'u1'),
+    ('task', '<i4'),
+    ('x', '<i4'),
+    ('y', '<i4'),
+    ('cluster_size', '<i4'),
+    ('team_size', '<i4'),
+    ('assigned', '<i4'),
+    ('manager', '<i4'),
+])
+
+STREAMS = ('steps', 'keyframes', 'delta_cells', 'delta_values', 'firefighters', 'drones', 'splashes', 'contracts')
+
+
+class TrajectoryRecorder:
+    # Streams a run to flat binary files that Replay maps from disk: per step
+    # the cells whose condition changed, a full grid every keyframe_every
+    # steps, agent positions, water splashes and contract events. The
+    # manifest is rewritten every keyframe_every steps, so a long run can be
+    # replayed up to there while it continues.
+    def __init__(self, model, directory, keyframe_every=50):
+        self.model = model
+        self.directory = directory
+        self.keyframe_every = keyframe_every
+        self.cell_dtype = np.dtype('<i4' if model.fire.condition.size < 2 ** 31 else '<i8')
+        self.files = {}
+        os.makedirs(directory, exist_ok=True)
+        self.start()
+
+    def start(self):
+        # Starts over from the model's current state, e.g. after a restore;
+        # completed contracts from before are not replayed
+        self.close()
+        self.files = {name: open(os.path.join(self.directory, f"{name}.bin"), 'wb') for name in STREAMS}
+        self.count = 0
+        self.ends = np.zeros(1, dtype=STEP_DTYPE)
+        self.previous = None
+        self.tasks, self._task_codes = [], {}
+        self.managers, self._manager_codes = [], {}
+        self._status = {}
+        self._archived = len(self.model.fire_contracts.archive)
+
+    def capture(self):
+        model = self.model
+        condition = model.fire.condition
+        files = self.files
+
+        if self.count % self.keyframe_every == 0:
+            files['keyframes'].write(condition.tobytes())
+        if self.previous is None:
+            self.previous = condition.copy()
+        changed = np.flatnonzero(condition != self.previous)
+        self.previous[...] = condition
+        files['delta_cells'].write(changed.astype(self.cell_dtype).tobytes())
+        files['delta_values'].write(condition.ravel()[changed].tobytes())
+
+        files['firefighters'].write(model.firefighter_fleet.positions.astype('<i4').tobytes())
+        files['drones'].write(model.drone_fleet.positions.astype('<i4').tobytes())
+        splashes = recent_splashes(model)
+        files['splashes'].write(splashes.astype('<i4').tobytes())
+        events = self._contract_events(model.t)
+        files['contracts'].write(events.tobytes())
+
+        ends = self.ends
+        ends['t'] = model.t
+        ends['alive'] = model.fire.count(ALIVE)
+        ends['delta_end'] += len(changed)
+        ends['splash_end'] += len(splashes)
+        ends['contract_end'] += len(events)
+        files['steps'].write(ends.tobytes())
+
+        self.count += 1
+        if self.count % self.keyframe_every == 0:
+            self.flush()
+
+    def _contract_events(self, t):
+        # Status changes on the contract board since the last capture
+        board = self.model.fire_contracts
+        rows = []
+        for contract in board.with_status("open") + board.with_status("assigned"):
+            seen = self._status.get(contract["task_id"])
+            if seen is None:
+                rows.append(self._event(t, 'created', contract))
+            if contract["status"] == "assigned" and seen != "assigned":
+                rows.append(self._event(t, 'assigned', contract))
+            self._status[contract["task_id"]] = contract["status"]
+        for contract in board.archive[self._archived:]:
+            seen = self._status.pop(contract["task_id"], None)
+            if seen is None:
+                rows.append(self._event(t, 'created', contract))
+            if seen != "assigned":
+                rows.append(self._event(t, 'assigned', contract))
+            rows.append(self._event(t, 'completed', contract))
+        self._archived = len(board.archive)
+        return np.array(rows, dtype=CONTRACT_DTYPE)
+
+    def _event(self, t, event, contract):
+        x, y = contract["location"]
+        return (t, CONTRACT_EVENTS.index(event), _intern(self.tasks, self._task_codes, contract["task_id"]),
+                x, y, len(contract["cluster"]), contract["team_size"], len(contract["assigned"]),
+                _intern(self.managers, self._manager_codes, contract["manager"]))
+
+    def flush(self):
+        for f in self.files.values():
+            f.flush()
+        model = self.model
+        manifest = {
+            'shape': list(model.fire.shape),
+            'steps': self.count,
+            'keyframe_every': self.keyframe_every,
+            'cell_dtype': self.cell_dtype.str,
+            'firefighter_ids': [f.firefighter_id for f in model.firefighters],
+            'drone_ids': [d.drone_id for d in model.drones],
+            'firefighter_range': model.p.sensor_range,
+            'drone_range': model.p.drone_sensor_range,
+            'tasks': self.tasks,
+            'managers': self.managers,
+        }
+        path = os.path.join(self.directory, MANIFEST)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(manifest, f)
+        os.replace(path + '.tmp', path)
+
+    def close(self):
+        if self.files:
+            self.flush()
+            for f in self.files.values():
+                f.close()
+            self.files = {}
+
+
+def _intern(values, codes, value):
+    code = codes.get(value)
+    if code is None:
+        code = codes[value] = len(values)
+        values.append(value)
+    return code
+
+
+def _map(directory, name, dtype, shape):
+    if not np.prod(shape):
+        return np.empty(shape, dtype=dtype)
+    return np.memmap(os.path.join(directory, f"{name}.bin"), dtype=dtype, mode='r', shape=shape)
+
+
+class Replay:
+    # Random access over a recording; all streams stay on disk as memory
+    # maps. A condition grid is rebuilt from the last one when moving forward
+    # within a keyframe interval, otherwise from the interval's keyframe, so
+    # no frame applies more than keyframe_every deltas and playing forward
+    # applies one per frame.
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST)) as f:
+            self.manifest = manifest = json.load(f)
+
+        n = manifest['steps']
+        self.shape = rows, cols = tuple(manifest['shape'])
+        self.keyframe_every = every = manifest['keyframe_every']
+        self.steps = _map(directory, 'steps', STEP_DTYPE, (n,))
+        last = self.steps[-1] if n else np.zeros((), dtype=STEP_DTYPE)
+        self.keyframes = _map(directory, 'keyframes', np.uint8, (-(-n // every), rows, cols))
+        self.delta_cells = _map(directory, 'delta_cells', manifest['cell_dtype'], (last['delta_end'],))
+        self.delta_values = _map(directory, 'delta_values', np.uint8, (last['delta_end'],))
+        self.firefighters = _map(directory, 'firefighters', '<i4', (n, len(manifest['firefighter_ids']), 2))
+        self.drones = _map(directory, 'drones', '<i4', (n, len(manifest['drone_ids']), 2))
+        self.splashes = _map(directory, 'splashes', '<i4', (last['splash_end'], 2))
+        self.contracts = _map(directory, 'contracts', CONTRACT_DTYPE, (last['contract_end'],))
+
+        self._index = None
+        self._grid = None
+
+    def __reduce__(self):
+        # Pickles as its directory, e.g. for render_in_background
+        return Replay, (self.directory,)
+
+    def __len__(self):
+        return len(self.steps)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    @property
+    def times(self):
+        return self.steps['t']
+
+    def index_of(self, t):
+        i = int(np.searchsorted(self.steps['t'], t))
+        if i == len(self) or self.steps['t'][i] != t:
+            raise KeyError(f"time step {t} is not in the recording")
+        return i
+
+    def _span(self, column, i):
+        start = int(self.steps[column][i - 1]) if i else 0
+        return start, int(self.steps[column][i])
+
+    def condition(self, i):
+        i = range(len(self))[i]
+        every = self.keyframe_every
+        if self._index is None or i < self._index or i // every != self._index // every:
+            self._index = i - i % every
+            self._grid = np.array(self.keyframes[i // every])
+        flat = self._grid.reshape(-1)
+        for j in range(self._index + 1, i + 1):
+            start, stop = self._span('delta_end', j)
+            flat[self.delta_cells[start:stop]] = self.delta_values[start:stop]
+        self._index = i
+        return self._grid.copy()
+
+    def __getitem__(self, i):
+        # The frame at index i, in the format of FrameRecorder
+        i = range(len(self))[i]
+        start, stop = self._span('splash_end', i)
+        return {
+            't': int(self.steps['t'][i]),
+            'condition': self.condition(i),
+            'firefighters': np.array(self.firefighters[i]),
+            'drones': np.array(self.drones[i]),
+            'splashes': np.array(self.splashes[start:stop]),
+            'alive': int(self.steps['alive'][i]),
+        }
+
+    def seek(self, t):
+        return self[self.index_of(t)]
+
+    def _indices(self, start, stop):
+        times = self.steps['t']
+        first = 0 if start is None else int(np.searchsorted(times, start))
+        last = len(self) if stop is None else int(np.searchsorted(times, stop))
+        return first, last
+
+    def frames(self, start=None, stop=None, step=1):
+        # Frames for time steps start <= t < stop
+        first, last = self._indices(start, stop)
+        for i in range(first, last, step):
+            yield self[i]
+
+    def contract_events(self, start=None, stop=None):
+        # Contract event rows for time steps start <= t < stop, still mapped
+        first, last = self._indices(start, stop)
+        if first >= last:
+            return self.contracts[:0]
+        return self.contracts[self._span('contract_end', first)[0]:self._span('contract_end', last - 1)[1]]
+
+    def contract_frame(self, start=None, stop=None):
+        import pandas as pd
+
+        events = self.contract_events(start, stop)
+        frame = pd.DataFrame(np.asarray(events))
+        frame['event'] = pd.Categorical.from_codes(events['event'], categories=CONTRACT_EVENTS)
+        frame['task'] = pd.Categorical.from_codes(events['task'], categories=self.manifest['tasks'])
+        frame['manager'] = pd.Categorical.from_codes(events['manager'], categories=self.manifest['managers'])
+        return frame
+
+    def recording(self):
+        # What render() takes, with frames read from disk one at a time
+        manifest = self.manifest
+        return {
+            'size': self.shape[0],
+            'firefighter_ids': manifest['firefighter_ids'],
+            'drone_ids': manifest['drone_ids'],
+            'firefighter_range': manifest['firefighter_range'],
+            'drone_range': manifest['drone_range'],
+            'frames': self,
+        }
@@ -0,0 +1,125 @@
+import numpy as np
+
+from simulation.fire_engine import ALIVE, BURNING, BURNED, NO_TREE
+
+COLORS = {
+    ALIVE: '#7FC97F',
+    BURNING: '#d62c2c',
+    BURNED: '#e5e5e5',
+    NO_TREE: '#d5e5d5',
+}
+
+SPLASH_STEPS = 5
+
+
+def recent_splashes(model):
+    # Cells watered during the last SPLASH_STEPS steps, newest first
+    splashes = []
+    for pos, timestamp in reversed(model.water_splashes):
+        if model.t - timestamp >= SPLASH_STEPS:
+            break
+        splashes.append(pos)
+    return np.array(splashes, dtype=np.int32).reshape(-1, 2)
+
+
+class FrameRecorder:
+    # Compact per-step snapshots of a run: condition grid, agent positions and
+    # recent water splashes. Recorded during the logged run, rendered offline.
+    def __init__(self, model):
+        self.model = model
+        self.size = model.p.size
+        self.firefighter_ids = [f.firefighter_id for f in model.firefighters]
+        self.drone_ids = [d.drone_id for d in model.drones]
+        self.firefighter_range = model.p.sensor_range
+        self.drone_range = model.p.drone_sensor_range
+        self.frames = []
+
+    def capture(self):
+        model = self.model
+        self.frames.append({
+            't': model.t,
+            'condition': model.fire.condition.copy(),
+            'firefighters': model.firefighter_fleet.positions.astype(np.int32),
+            'drones': model.drone_fleet.positions.astype(np.int32),
+            'splashes': recent_splashes(model),
+            'alive': model.fire.count(ALIVE),
+        })
+
+    def recording(self):
+        # Everything render() needs, without a reference to the model
+        return {
+            'size': self.size,
+            'firefighter_ids': self.firefighter_ids,
+            'drone_ids': self.drone_ids,
+            'firefighter_range': self.firefighter_range,
+            'drone_range': self.drone_range,
+            'frames': self.frames,
+        }
+
+
+def render(recording, path, fps=15, dpi=100):
+    # Draws the first frame once and then only updates the image data and the
+    # artists' positions, writing straight to a GIF (Pillow) or video (ffmpeg)
+    from matplotlib.animation import FFMpegWriter, PillowWriter
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.colors import ListedColormap
+    from matplotlib.figure import Figure
+    from matplotlib.patches import Circle
+
+    codes = sorted(COLORS)
+    lookup = np.zeros(256, dtype=np.uint8)
+    lookup[codes] = np.arange(len(codes))
+    cmap = ListedColormap([COLORS[c] for c in codes])
+
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.set_axis_off()
+
+    frames = recording['frames']
+    first = frames[0]
+    image = ax.imshow(lookup[first['condition']], cmap=cmap, vmin=0, vmax=len(codes) - 1,
+                      interpolation='nearest')
+    splashes = ax.scatter([], [], color='white', s=20, marker='o', alpha=0.9)
+
+    def agent_artists(ids, sensor_range, halo_color, alpha, text_style):
+        halos = [ax.add_patch(Circle((0, 0), sensor_range, color=halo_color, alpha=alpha)) for _ in ids]
+        labels = [ax.text(0, 0, str(i), ha='center', va='center', fontweight='bold', **text_style) for i in ids]
+        return halos, labels
+
+    ff_halos, ff_labels = agent_artists(recording['firefighter_ids'], recording['firefighter_range'],
+                                        'cyan', 0.2, {'color': 'blue', 'fontsize': 5})
+    drone_halos, drone_labels = agent_artists(recording['drone_ids'], recording['drone_range'],
+                                              'yellow', 0.1, {'color': 'orange', 'fontsize': 9})
+    drone_markers = ax.scatter([], [], color='yellow', s=50, marker='D')
+    title = ax.set_title('')
+
+    def move(halos, labels, positions):
+        for halo, label, (x, y) in zip(halos, labels, positions.tolist()):
+            halo.center = (y, x)
+            label.set_position((y, x))
+
+    def update(frame):
+        image.set_data(lookup[frame['condition']])
+        splashes.set_offsets(frame['splashes'][:, ::-1])
+        move(ff_halos, ff_labels, frame['firefighters'])
+        move(drone_halos, drone_labels, frame['drones'])
+        drone_markers.set_offsets(frame['drones'][:, ::-1])
+        title.set_text(f"Forest Fire Simulation\nTime-step: {frame['t']}, Trees left: {frame['alive']}")
+
+    writer = PillowWriter(fps=fps) if str(path).endswith('.gif') else FFMpegWriter(fps=fps)
+    with writer.saving(fig, path, dpi):
+        for frame in frames:
+            update(frame)
+            writer.grab_frame()
+    return path
+
+
+def render_in_background(recording, path, fps=15):
+    # Renders in a separate process; returns a Future with the output path
+    from concurrent.futures import ProcessPoolExecutor
+
+    executor = ProcessPoolExecutor(max_workers=1)
+    future = executor.submit(render, recording, path, fps)
+    executor.shutdown(wait=False)
+    return future
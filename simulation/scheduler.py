@@ -0,0 +1,139 @@
+import numpy as np
+
+from simulation.fire_engine import BURNING
+from simulation.spatial import disk_offsets
+
+
+class EventScheduler:
+    # Ticks only agents that have something to do this step: a burning cell
+    # within sensor range, holding a contract, or out of water. Open contracts
+    # are evaluated in one batch by the firefighters that are not ticked, one
+    # distance field lookup per contract for all of them. The rest only take
+    # their patrol or wander move; the wander moves and the position rows of
+    # the idle firefighters are written in one batch.
+    def __init__(self, model):
+        self.model = model
+
+    def near_fire(self, positions, radius):
+        # Which positions have a burning cell within radius, read from the
+        # condition grid around each of them; the cost follows the agents
+        fire = self.model.fire
+        if not fire.burning or not len(positions):
+            return np.zeros(len(positions), dtype=bool)
+        dx, dy, _ = disk_offsets(radius)
+        x, y = positions[:, 0, None] + dx, positions[:, 1, None] + dy
+        rows, cols = fire.shape
+        inside = (x >= 0) & (x < rows) & (y >= 0) & (y < cols)
+        burning = fire.condition[np.where(inside, x, 0), np.where(inside, y, 0)] == BURNING
+        return (burning & inside).any(axis=1)
+
+    def evaluate_contracts(self, firefighters):
+        # The same bids and declines the firefighters would make in step()
+        board = self.model.fire_contracts
+        navigation = self.model.navigation
+        for contract in board.with_status("open"):
+            pending = [f for f in firefighters if not board.has_evaluated(contract, f.firefighter_id)]
+            if not pending:
+                continue
+            cells = np.array([f.pos for f in pending])
+            distances = navigation.field(contract["location"])[navigation.node[cells[:, 0], cells[:, 1]]]
+            for firefighter, dist in zip(pending, distances.tolist()):
+                if dist == np.inf:
+                    board.decline(contract, firefighter.firefighter_id)
+                else:
+                    firefighter.submit_bid(contract, firefighter.make_bid(dist))
+
+    def firefighter_phase(self):
+        model = self.model
+        board = model.fire_contracts
+        fleet = model.firefighter_fleet
+        near = self.near_fire(fleet.positions, model.p.sensor_range)
+
+        idle = []
+        for firefighter, near_fire in zip(model.firefighters, near.tolist()):
+            if firefighter.water_supply == 0 or near_fire or board.assigned_to(firefighter.firefighter_id):
+                firefighter.step()
+            else:
+                idle.append(firefighter)
+        if not idle:
+            return
+
+        self.evaluate_contracts(idle)
+        indexes = np.array([f.index for f in idle])
+        cells = fleet.positions[indexes]
+        model.position_logs.extend(len(idle), time=model.t, agent_id=[f.firefighter_id for f in idle],
+                                   type="firefighter", x=cells[:, 0], y=cells[:, 1])
+        fleet.request_moves(indexes, model.nprandom.integers(0, model.p.size, size=(len(idle), 2)))
+
+    def drone_phase(self):
+        model = self.model
+        near = self.near_fire(model.drone_fleet.positions, model.p.drone_sensor_range)
+        for drone, near_fire in zip(model.drones, near.tolist()):
+            if near_fire:
+                drone.step()
+                continue
+            drone.log_position()
+            if drone.needs_recharge():
+                drone.return_to_base()
+            else:
+                drone.patrol()
+
+    def close(self):
+        pass
+
+    def finished(self):
+        # Open contracts may never get a bid (everyone out of water or out of
+        # reach); with nothing burning their clusters are out, so they do not
+        # keep the run going
+        fire = self.model.fire
+        board = self.model.fire_contracts
+        return not fire.burning and not board.with_status("assigned")
+
+
+class TwoPhaseScheduler:
+    # Every agent first decides from the state at the start of the phase,
+    # then the decisions are committed in agent order. apply() re-checks what
+    # earlier commits changed (a cluster that already got a contract, a fire
+    # already put out, a contract already completed); the fleets resolve cell
+    # collisions when they move and assign_contracts awards each firefighter
+    # once. Deciding only reads the model, so with workers > 1 it runs on a
+    # thread pool over chunks of agents. Random draws are made up front, one
+    # row per agent, so the outcome does not depend on the workers.
+    def __init__(self, model, workers=0):
+        self.model = model
+        self.workers = workers
+        self.executor = None
+        if workers > 1:
+            from concurrent.futures import ThreadPoolExecutor
+            self.executor = ThreadPoolExecutor(max_workers=workers)
+
+    def decide(self, agents, draws):
+        if self.executor is None or len(agents) < 2:
+            return [agent.decide(draw) for agent, draw in zip(agents, draws)]
+        size = -(-len(agents) // self.workers)
+        chunks = [range(start, min(start + size, len(agents))) for start in range(0, len(agents), size)]
+        decided = self.executor.map(lambda chunk: [agents[i].decide(draws[i]) for i in chunk], chunks)
+        return [intent for intents in decided for intent in intents]
+
+    def commit(self, agents, intents):
+        for agent, intent in zip(agents, intents):
+            agent.apply(intent)
+
+    def firefighter_phase(self):
+        model = self.model
+        firefighters = model.firefighters
+        targets = [tuple(t) for t in model.nprandom.integers(0, model.p.size, size=(len(firefighters), 2)).tolist()]
+        self.commit(firefighters, self.decide(firefighters, targets))
+
+    def drone_phase(self):
+        model = self.model
+        drones = model.drones
+        draws = model.nprandom.random((len(drones), 2)).tolist()
+        self.commit(drones, self.decide(drones, draws))
+
+    def close(self):
+        if self.executor:
+            self.executor.shutdown()
+
+    def finished(self):
+        return False
@@ -0,0 +1,25 @@
+from functools import lru_cache
+
+import numpy as np
+
+
+@lru_cache(maxsize=None)
+def disk_offsets(radius):
+    # Offsets of all cells within Euclidean distance `radius`, nearest first
+    # (ties broken row-major so queries stay deterministic)
+    r = int(np.floor(radius))
+    dx, dy = np.mgrid[-r:r + 1, -r:r + 1]
+    dist = np.hypot(dx, dy)
+    inside = dist <= radius
+    dx, dy, dist = dx[inside], dy[inside], dist[inside]
+    order = np.lexsort((dy, dx, dist))
+    return dx[order], dy[order], dist[order]
+
+
+def cells_within(pos, radius, shape):
+    # Grid cells around pos inside the disk, cost bounded by radius²
+    dx, dy, dist = disk_offsets(radius)
+    x, y = dx + pos[0], dy + pos[1]
+    inside = (x >= 0) & (x < shape[0]) & (y >= 0) & (y < shape[1])
+    return x[inside], y[inside], dist[inside]
+
@@ -0,0 +1,138 @@
+import argparse
+import csv
+import itertools
+import json
+import os
+from multiprocessing import Pool
+
+from ForestModel import ForestModel
+from simulation.parameters import DEFAULT_PARAMETERS
+
+# Parameters that identify one run of a sweep, used to resume interrupted sweeps
+SWEEP_KEYS = ['seed', 'Tree density', 'num_firefighters', 'num_drones']
+
+
+def sweep_parameters(base, seeds, densities, firefighters, drones):
+    for seed, density, n_firefighters, n_drones in itertools.product(seeds, densities, firefighters, drones):
+        parameters = dict(base)
+        parameters.update({
+            'seed': seed,
+            'Tree density': density,
+            'num_firefighters': n_firefighters,
+            'num_drones': n_drones,
+        })
+        yield parameters
+
+
+def run_key(row):
+    return tuple(str(row[k]) for k in SWEEP_KEYS)
+
+
+def contract_summary(board):
+    contracts = list(board)
+    assigned = [c for c in contracts if c["assign_time"] is not None]
+
+    def mean(values):
+        return sum(values) / len(values) if values else float('nan')
+
+    return {
+        'contracts_created': len(contracts),
+        'contracts_assigned': len(assigned),
+        'contracts_completed': len(board.archive),
+        'avg_team_size': mean([c["team_size"] for c in contracts]),
+        'avg_cluster_size': mean([len(c["cluster"]) for c in contracts]),
+        'avg_assign_delay': mean([c["assign_time"] - c["timestamp"] for c in assigned]),
+    }
+
+
+def run_single(parameters):
+    # Runs one model and returns a flat row; the logs never leave the worker
+    model = ForestModel(parameters)
+    model.run(display=False)
+    row = {k: parameters[k] for k in SWEEP_KEYS}
+    row.update(model.reporters)
+    row.update(contract_summary(model.fire_contracts))
+    row.update(model.metrics.summary(model))
+    row['steps_run'] = model.t
+    return row
+
+
+def completed_runs(output):
+    if not os.path.exists(output):
+        return None, set()
+    # An interrupted sweep may have left a partial last line behind
+    with open(output, 'rb+') as f:
+        data = f.read()
+        end = data.rfind(b'\n') + 1
+        if end < len(data):
+            f.truncate(end)
+    with open(output, newline='') as f:
+        reader = csv.DictReader(f)
+        done = {run_key(row) for row in reader}
+        return reader.fieldnames, done
+
+
+def check_base(base, output):
+    # The parameters shared by all runs are kept next to the table; resuming
+    # with others would skip runs that only look finished and mix the results
+    path = output + '.parameters.json'
+    base = json.loads(json.dumps({k: v for k, v in base.items() if k not in SWEEP_KEYS}))
+    if os.path.exists(path):
+        with open(path) as f:
+            saved = json.load(f)
+        if saved != base:
+            changed = sorted(k for k in saved.keys() | base.keys() if saved.get(k) != base.get(k))
+            raise ValueError(f"'{output}' was run with other parameters ({', '.join(changed)}); "
+                             f"use another output")
+    elif os.path.exists(output):
+        raise ValueError(f"'{output}' has no record of its parameters ({path}); use another output")
+    else:
+        with open(path, 'w') as f:
+            json.dump(base, f, indent=2)
+
+
+def run_sweep(runs, output, processes=None, base=None):
+    if base is not None:
+        check_base(base, output)
+    fieldnames, done = completed_runs(output)
+    pending = [p for p in runs if run_key(p) not in done]
+    if not pending:
+        return 0
+
+    with Pool(processes) as pool, open(output, 'a', newline='') as f:
+        writer = None
+        if fieldnames:
+            writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
+        for row in pool.imap_unordered(run_single, pending):
+            if writer is None:
+                writer = csv.DictWriter(f, fieldnames=list(row), extrasaction='ignore')
+                writer.writeheader()
+            writer.writerow(row)
+            f.flush()
+    return len(pending)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a ForestModel parameter sweep on a process pool.")
+    parser.add_argument('--seeds', type=int, nargs='+', default=list(range(10)))
+    parser.add_argument('--density', type=float, nargs='+', default=[DEFAULT_PARAMETERS['Tree density']])
+    parser.add_argument('--firefighters', type=int, nargs='+', default=[DEFAULT_PARAMETERS['num_firefighters']])
+    parser.add_argument('--drones', type=int, nargs='+', default=[DEFAULT_PARAMETERS['num_drones']])
+    parser.add_argument('--size', type=int, default=DEFAULT_PARAMETERS['size'])
+    parser.add_argument('--steps', type=int, default=DEFAULT_PARAMETERS['steps'])
+    parser.add_argument('--processes', type=int, default=None, help="default: all cores")
+    parser.add_argument('--output', default='sweep_results.csv')
+    args = parser.parse_args()
+
+    base = dict(DEFAULT_PARAMETERS, size=args.size, steps=args.steps,
+                debug_mode=False, log_level='none')
+    runs = sweep_parameters(base, args.seeds, args.density, args.firefighters, args.drones)
+    try:
+        n = run_sweep(runs, args.output, args.processes, base)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"✅ {n} runs written to '{args.output}'")
+
+
+if __name__ == '__main__':
+    main()
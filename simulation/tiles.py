@@ -0,0 +1,200 @@
+import multiprocessing as mp
+import weakref
+from collections import defaultdict
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from simulation.fire_engine import FireEngine, ALIVE, BURNING, BURNED, ignition_targets
+
+
+class TileLayout:
+    # The grid cut into tile_rows x tile_cols rectangles, numbered row-major;
+    # (2, 2) gives the former drone quadrants
+    def __init__(self, shape, tiles):
+        self.shape = tuple(shape)
+        self.tiles = tuple(tiles)
+        self.row_edges = np.linspace(0, self.shape[0], self.tiles[0] + 1).astype(np.int64)
+        self.col_edges = np.linspace(0, self.shape[1], self.tiles[1] + 1).astype(np.int64)
+
+    def __len__(self):
+        return self.tiles[0] * self.tiles[1]
+
+    def bounds(self, tile):
+        # (row_start, row_stop, col_start, col_stop) of a tile
+        i, j = divmod(tile, self.tiles[1])
+        return (int(self.row_edges[i]), int(self.row_edges[i + 1]),
+                int(self.col_edges[j]), int(self.col_edges[j + 1]))
+
+    def tile_of(self, cells):
+        cells = np.asarray(cells, dtype=np.int64).reshape(-1, 2)
+        i = np.searchsorted(self.row_edges, cells[:, 0], side='right') - 1
+        j = np.searchsorted(self.col_edges, cells[:, 1], side='right') - 1
+        return i * self.tiles[1] + j
+
+
+def _halo_cells(condition, bounds, width):
+    # Burning cells on the ring of the kernel's reach around a tile, read from
+    # the shared grid one border strip at a time
+    r0, r1, c0, c1 = bounds
+    rows, cols = condition.shape
+    h0, h1, g0, g1 = max(r0 - width, 0), min(r1 + width, rows), max(c0 - width, 0), min(c1 + width, cols)
+    cells = []
+    for x0, x1, y0, y1 in ((h0, r0, g0, g1), (r1, h1, g0, g1), (r0, r1, g0, c0), (r0, r1, c1, g1)):
+        x, y = np.nonzero(condition[x0:x1, y0:y1] == BURNING)
+        cells.append(np.stack([x + x0, y + y0], axis=1))
+    return np.concatenate(cells)
+
+
+def _tile_worker(names, shape, timer, bounds, kernel, radius, tree_burn_time, entropy, tile, conn):
+    condition_shm, burn_time_shm = SharedMemory(name=names[0]), SharedMemory(name=names[1])
+    condition = np.ndarray(shape, dtype=np.uint8, buffer=condition_shm.buf)
+    burn_time = np.ndarray(shape, dtype=timer, buffer=burn_time_shm.buf)
+    cols = shape[1]
+
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        t, cells = message
+
+        # Halo exchange: every worker reads its neighbors' edge rows before
+        # anyone writes this step's changes, the engine says when all have read
+        sources = np.concatenate([cells, _halo_cells(condition, bounds, radius)])
+        flat, prob = ignition_targets(sources, kernel, bounds, cols)
+        alive = condition.ravel()[flat] == ALIVE
+        conn.send(None)
+        conn.recv()
+
+        # Seeded by (run, step, tile), so a step does not depend on earlier draws
+        rng = np.random.default_rng([entropy, t, tile])
+        prob = prob[alive]
+        ignited = np.divmod(flat[alive][rng.random(prob.size) < prob], cols)
+
+        burning = (cells[:, 0], cells[:, 1])
+        burn_time[burning] -= 1
+        burned = tuple(axis[burn_time[burning] <= 0] for axis in burning)
+        condition[burned] = BURNED
+
+        condition[ignited] = BURNING
+        burn_time[ignited] = tree_burn_time
+        conn.send((burned, ignited))
+
+    del condition, burn_time
+    condition_shm.close()
+    burn_time_shm.close()
+
+
+def _shutdown(workers, connections, memory):
+    for conn in connections:
+        conn.send(None)
+    for worker in workers:
+        worker.join()
+    for shm in memory:
+        shm.unlink()
+        try:
+            shm.close()
+        except BufferError:
+            # Arrays still point into it; the mapping goes away with them
+            pass
+
+
+class TiledFireEngine(FireEngine):
+    # Fire spread split over one worker process per tile. The condition and
+    # burn_time grids live in shared memory: a worker writes only its own tile
+    # and reads the ring of cells around it from its neighbors. Tiles without
+    # fire in or within the kernel's reach of them are not sent the step.
+    def __init__(self, model, shape, tiles):
+        super().__init__(model, shape)
+        self.layout = TileLayout(self.shape, tiles)
+        self.memory = []
+        self.condition = self._shared(self.condition)
+        self.burn_time = self._shared(self.burn_time)
+        self.entropy = int(model.nprandom.integers(2 ** 63))
+        self.connections = []
+        self.workers = []
+        self._finalizer = weakref.finalize(self, _shutdown, self.workers, self.connections, self.memory)
+
+    def _shared(self, array):
+        shm = SharedMemory(create=True, size=array.nbytes)
+        self.memory.append(shm)
+        shared = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)
+        shared[...] = array
+        return shared
+
+    def start(self):
+        names = [shm.name for shm in self.memory]
+        for tile in range(len(self.layout)):
+            parent, child = mp.Pipe()
+            worker = mp.Process(target=_tile_worker, daemon=True, args=(
+                names, self.shape, self.burn_time.dtype, self.layout.bounds(tile), self.kernel,
+                self.kernel_radius, self.tree_burn_time, self.entropy, tile, child))
+            worker.start()
+            self.connections.append(parent)
+            self.workers.append(worker)
+
+    def close(self):
+        # Back to private arrays, so the model stays readable after the run
+        self.condition = self.condition.copy()
+        self.burn_time = self.burn_time.copy()
+        self._finalizer()
+
+    def tiles_near(self, cells):
+        # Tiles holding a burning cell or within the kernel's reach of one
+        layout, radius = self.layout, self.kernel_radius
+        rows, cols = self.shape
+        x, y = cells[:, 0], cells[:, 1]
+        i0 = np.searchsorted(layout.row_edges, np.maximum(x - radius, 0), side='right') - 1
+        i1 = np.searchsorted(layout.row_edges, np.minimum(x + radius, rows - 1), side='right') - 1
+        j0 = np.searchsorted(layout.col_edges, np.maximum(y - radius, 0), side='right') - 1
+        j1 = np.searchsorted(layout.col_edges, np.minimum(y + radius, cols - 1), side='right') - 1
+        near = np.zeros(layout.tiles, dtype=bool)
+        for a, b, c, d in np.unique(np.stack([i0, i1, j0, j1], axis=1), axis=0).tolist():
+            near[a:b + 1, c:d + 1] = True
+        return np.flatnonzero(near).tolist()
+
+    def spread(self, cells):
+        if not len(cells):
+            return
+        if not self.workers:
+            self.start()
+
+        tiles = self.layout.tile_of(cells)
+        active = [(tile, self.connections[tile]) for tile in self.tiles_near(cells)]
+        for tile, conn in active:
+            conn.send((self.model.t, cells[tiles == tile]))
+        for _, conn in active:
+            conn.recv()
+        for _, conn in active:
+            conn.send(None)
+        for _, conn in active:
+            burned, ignited = conn.recv()
+            self.burning.difference_update(zip(*(axis.tolist() for axis in burned)))
+            self.burning.update(zip(*(axis.tolist() for axis in ignited)))
+
+
+def rebalance_drones(model):
+    # Every tile with fire gets a drone before any tile gets a second one, and
+    # drones come back to uncovered tiles once their fire is out. Drones are
+    # only taken from fire-free tiles, the most crowded first.
+    layout = model.tiles
+    fire = np.bincount(layout.tile_of(model.fire.burning_cells()), minlength=len(layout))
+    owners = defaultdict(list)
+    for drone in model.drones:
+        owners[drone.tile].append(drone)
+
+    def donor(minimum):
+        spare = [t for t in range(len(layout)) if not fire[t] and len(owners[t]) >= minimum]
+        return max(spare, key=lambda t: len(owners[t]), default=None)
+
+    uncovered = [t for t in np.argsort(-fire, kind='stable').tolist() if not owners[t]]
+    for tile in uncovered:
+        source = donor(1) if fire[tile] else donor(2)
+        if source is None:
+            continue
+        drone = owners[source].pop()
+        drone.set_tile(tile, layout.bounds(tile))
+        drone.target = drone.random_target_in_quadrant()
+        owners[tile].append(drone)
+
+    model.tile_drones = owners
@@ -0,0 +1,80 @@
+import itertools
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from simulation.assignment import assign_contracts
+from simulation.contract_board import ContractBoard
+from simulation.log_sink import ColumnarLog, CONTRACT_COLUMNS
+from simulation.metrics import ContractMetrics
+
+
+def contract(name, team_size=1, status="open", assigned=()):
+    return {"task_id": name, "location": (0, len(name)), "cluster": [(0, len(name))], "status": status,
+            "bids": [], "assigned": list(assigned), "team_size": team_size, "assign_time": None,
+            "manager": 0, "tile": 0}
+
+
+def model_with(bids, team_sizes=None, busy=()):
+    board = ContractBoard()
+    for name in bids:
+        board.add(contract(name, (team_sizes or {}).get(name, 1)))
+    board.add(contract("busy", status="assigned", assigned=busy))
+    for c in board.with_status("open"):
+        for firefighter_id, bid in bids[c["task_id"]].items():
+            board.add_bid(c, {"firefighter_id": firefighter_id, "bid": bid})
+    return SimpleNamespace(fire_contracts=board, metrics=ContractMetrics(), t=3,
+                           contract_logs=ColumnarLog(CONTRACT_COLUMNS))
+
+
+def awards(model):
+    return {c["task_id"]: sorted(c["assigned"]) for c in model.fire_contracts.with_status("assigned")
+            if c["task_id"] != "busy"}
+
+
+def test_unfillable_slots_do_not_hide_the_cheapest_award():
+    model = model_with({
+        "A": {2: 0.198},
+        "B": {9: 1.0},
+        "C": {2: 2.62},
+        "D": {0: 4.31, 1: 2.52, 2: 4.28},
+    }, busy=[9])
+    assign_contracts(model)
+    assert awards(model) == {"A": [2], "D": [1]}
+    assert model.fire_contracts.assigned_to(9)[0]["task_id"] == "busy"
+
+
+def brute_force(bids, team_sizes):
+    # Fills as many slots as possible, then takes the lowest total bid
+    firefighters = sorted({f for b in bids.values() for f in b})
+    slots = [name for name in bids for _ in range(min(team_sizes[name], len(firefighters)))]
+    best = None
+    for choice in itertools.product([None] + firefighters, repeat=len(slots)):
+        chosen = [f for f in choice if f is not None]
+        if len(set(chosen)) != len(chosen):
+            continue
+        if any(f is not None and f not in bids[name] for name, f in zip(slots, choice)):
+            continue
+        key = (-len(chosen), round(sum(bids[name][f] for name, f in zip(slots, choice) if f is not None), 9))
+        best = key if best is None else min(best, key)
+    return best
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_award_fills_most_slots_at_lowest_total_bid(seed):
+    rng = random.Random(seed)
+    names = "ABCD"[:rng.randint(1, 4)]
+    team_sizes = {name: rng.randint(1, 2) for name in names}
+    bids = {name: {f: round(rng.uniform(0.1, 50), 3) for f in range(4) if rng.random() < 0.4}
+            for name in names}
+    bids = {name: b for name, b in bids.items() if b}
+    if not bids:
+        return
+    model = model_with(bids, team_sizes)
+    assign_contracts(model)
+
+    won = awards(model)
+    total = round(sum(bids[name][f] for name, team in won.items() for f in team), 9)
+    assert (-sum(len(team) for team in won.values()), total) == brute_force(bids, team_sizes)
+    assert all(len(team) <= team_sizes[name] for name, team in won.items())
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from simulation.log_export import read_log
+from simulation.recording import Replay
+
+from ForestModel import ForestModel
+from simulation.checkpoint import fork, resume
+from simulation.parameters import DEFAULT_PARAMETERS
+
+
+def started(**overrides):
+    parameters = dict(DEFAULT_PARAMETERS, size=80, tiles=(3, 3), num_drones=4, num_firefighters=20,
+                      steps=60, debug_mode=False, **overrides)
+    model = ForestModel(parameters)
+    model.sim_setup()
+    for _ in range(30):
+        model.sim_step()
+    return model
+
+
+def continued_and_forked(**overrides):
+    model = started(**overrides)
+    return model, fork(model)
+
+
+@pytest.mark.parametrize('fire_engine', ['agents', 'vectorized'])
+@pytest.mark.parametrize('scheduler', ['all', 'event', 'two_phase'])
+def test_fork_matches_continued_run(fire_engine, scheduler):
+    model, forked = continued_and_forked(fire_engine=fire_engine, scheduler=scheduler)
+    assert [d.tile for d in forked.drones] == [d.tile for d in model.drones]
+
+    resume(model)
+    resume(forked)
+    assert model.t == forked.t
+    assert np.array_equal(model.fire.condition, forked.fire.condition)
+    assert np.array_equal(model.firefighter_fleet.positions, forked.firefighter_fleet.positions)
+    assert np.array_equal(model.drone_fleet.positions, forked.drone_fleet.positions)
+    assert [d.tile for d in forked.drones] == [d.tile for d in model.drones]
+    assert len(model.fire_contracts) == len(forked.fire_contracts)
+
+
+def test_fork_leaves_the_parent_outputs_alone(tmp_path):
+    outputs = dict(log_level='all', log_dir=str(tmp_path / 'logs'), record_dir=str(tmp_path / 'recording'))
+    model = started(**outputs)
+    forked = fork(model)
+    assert forked.p.get('log_dir') is None and forked.p.get('record_dir') is None
+    resume(forked)
+    resume(model)
+
+    reference = started(log_level='all', log_dir=str(tmp_path / 'reference'))
+    resume(reference)
+    assert len(Replay(model.p.record_dir)) == model.t + 1
+    for name in ('position_logs', 'contract_logs'):
+        assert read_log(model.p.log_dir, name).equals(read_log(reference.p.log_dir, name))
+
+
+def test_fork_to_the_parent_outputs_is_refused(tmp_path):
+    model = started(record_dir=str(tmp_path / 'recording'))
+    with pytest.raises(ValueError):
+        fork(model, record_dir=model.p.record_dir)
+    forked = fork(model, record_dir=str(tmp_path / 'forked'))
+    resume(forked)
+    assert len(Replay(forked.p.record_dir)) == forked.t - 30 + 1
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_added_firefighters_get_free_cells(seed):
+    model = ForestModel(dict(DEFAULT_PARAMETERS, seed=seed, steps=60, debug_mode=False))
+    model.sim_setup()
+    for _ in range(20):
+        model.sim_step()
+    forked = fork(model, num_firefighters=40, num_drones=12)
+
+    positions = [f.pos for f in forked.firefighters]
+    assert positions[:len(model.firefighters)] == [f.pos for f in model.firefighters]
+    assert len(set(positions)) == len(positions)
+    assert not any(forked.fire.has_tree(*cell) for cell in positions)
+    occupancy = np.zeros_like(forked.occupancy)
+    for agent in list(forked.firefighters) + list(forked.drones):
+        occupancy[agent.pos] += 1
+    assert np.array_equal(occupancy, forked.occupancy)
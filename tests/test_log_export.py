@@ -0,0 +1,24 @@
+from ForestModel import ForestModel
+from simulation.log_export import read_log, read_records
+from simulation.parameters import DEFAULT_PARAMETERS
+
+
+def run_into(log_dir):
+    model = ForestModel(dict(DEFAULT_PARAMETERS, size=60, steps=30, log_level='all', debug_mode=True,
+                             log_dir=str(log_dir)))
+    model.run(display=False)
+    return model
+
+
+def test_second_run_replaces_the_logs(tmp_path):
+    run_into(tmp_path)
+    first = {name: len(read_log(tmp_path, name)) for name in ('position_logs', 'contract_logs')}
+    first.update({name: len(read_records(tmp_path, name))
+                  for name in ('firefighter_debug_logs', 'drone_debug_logs')})
+    assert first['firefighter_debug_logs'] and first['drone_debug_logs']
+
+    run_into(tmp_path)
+    second = {name: len(read_log(tmp_path, name)) for name in ('position_logs', 'contract_logs')}
+    second.update({name: len(read_records(tmp_path, name))
+                   for name in ('firefighter_debug_logs', 'drone_debug_logs')})
+    assert second == first
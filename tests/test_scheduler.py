@@ -0,0 +1,41 @@
+import numpy as np
+
+from ForestModel import ForestModel
+from simulation.log_sink import ColumnarLog, POSITION_COLUMNS
+from simulation.parameters import DEFAULT_PARAMETERS
+from simulation.scheduler import EventScheduler
+
+
+def test_near_fire_matches_the_sensor_disk():
+    model = ForestModel(dict(DEFAULT_PARAMETERS, size=60, num_firefighters=200, num_drones=40,
+                             probSpread=0.5, scheduler='event', debug_mode=False))
+    model.sim_setup()
+    for _ in range(15):
+        model.sim_step()
+    scheduler = model.scheduler
+    for agents, fleet in ((model.firefighters, model.firefighter_fleet), (model.drones, model.drone_fleet)):
+        radius = agents[0].sensor_range
+        near = scheduler.near_fire(fleet.positions, radius)
+        assert near.tolist() == [bool(model.fire.burning_within(a.pos, radius)) for a in agents]
+        assert near.any() and not near.all()
+
+
+def test_near_fire_without_fire():
+    model = ForestModel(dict(DEFAULT_PARAMETERS, size=30, scheduler='event', debug_mode=False))
+    model.sim_setup()
+    model.fire.burning.clear()
+    assert not EventScheduler(model).near_fire(model.firefighter_fleet.positions, 2).any()
+
+
+def test_extend_matches_append_across_chunks():
+    appended = ColumnarLog(POSITION_COLUMNS, chunk_size=7)
+    extended = ColumnarLog(POSITION_COLUMNS, chunk_size=7)
+    ids = [f"F{i % 4}" for i in range(20)]
+    x, y = np.arange(20), np.arange(20)[::-1]
+    for i in range(20):
+        appended.append(time=3, agent_id=ids[i], type="firefighter", x=x[i], y=y[i])
+    extended.append(time=2, agent_id="D0", type="drone", x=1, y=1)
+    extended.extend(20, time=3, agent_id=ids, type="firefighter", x=x, y=y)
+    expected, got = appended.to_frame(), extended.to_frame().iloc[1:]
+    for column in POSITION_COLUMNS:
+        assert got[column].astype(str).tolist() == expected[column].astype(str).tolist()
@@ -0,0 +1,24 @@
+import pytest
+
+from simulation.parameters import DEFAULT_PARAMETERS
+from simulation.sweep import check_base
+
+
+def test_resume_needs_the_same_base_parameters(tmp_path):
+    output = str(tmp_path / 'sweep.csv')
+    base = dict(DEFAULT_PARAMETERS, size=30, steps=10)
+    check_base(base, output)
+    open(output, 'w').close()
+
+    check_base(dict(base, seed=4, num_drones=2), output)
+    with pytest.raises(ValueError, match='size'):
+        check_base(dict(base, size=40), output)
+    with pytest.raises(ValueError, match='steps'):
+        check_base(dict(base, steps=20), output)
+
+
+def test_table_without_parameters_is_refused(tmp_path):
+    output = tmp_path / 'sweep.csv'
+    output.write_text('seed\n0\n')
+    with pytest.raises(ValueError):
+        check_base(DEFAULT_PARAMETERS, str(output))